@@ -1,24 +1,42 @@
 """
 Brands API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, BackgroundTasks, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List, Optional, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import TypeAdapter
+from typing import List, Optional, Dict, Tuple
 from uuid import UUID
-import sys
+from bisect import bisect_left
+import asyncio
+import logging
 import os
 import re
 
-from app.core.database import get_db
+from app.core.database import get_async_db, AsyncSessionLocal, list_load_options
+from app.core.breaker import CircuitOpenError
+from app.core.rate_limit import DomainRateLimiter, run_browser_scrape
+from app.core.response_cache import ResponseCache, etag_response
 from app.models.brand import Brand
 from app.models.manufacturer import Manufacturer
 from app.models.product_catalog import ProductCatalog
 from app.models.category import Category
 from app.schemas.brand import BrandCreate, BrandUpdate, BrandResponse, BrandWithManufacturer
+from app.services.product_service import ProductService
+from app.api.categories import categories_cache
+import app.core.scraper_path  # noqa: F401 - agrega simplify-scraper al sys.path
+
+try:
+    from scrapers.jumbo_catalog import scrape_jumbo_catalog
+except ImportError:  # simplify-scraper no instalado junto a la API
+    scrape_jumbo_catalog = None
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 # Mapeo de palabras clave a categorías (nombres en inglés para BD)
 # Formato: 'Nombre Categoría BD': ['palabras', 'clave', 'en', 'español']
@@ -36,23 +54,85 @@ CATEGORY_KEYWORDS = {
 # Parent category para nuevas categorías de lácteos
 DAIRY_PARENT_SLUG = 'dairy'
 
+# Categorías (nombre en minúsculas) que cuelgan del parent de lácteos
+DAIRY_CATEGORIES = {'yogurt', 'milk', 'cheese', 'butter & margarine', 'cream', 'desserts'}
+
+# Scraping concurrente de marcas (/brands/search/batch)
+JUMBO_DOMAIN = 'jumbo.cl'
+SCRAPE_BATCH_CONCURRENCY = int(os.getenv("SCRAPE_BATCH_CONCURRENCY", 3))
+SCRAPE_MAX_RETRIES = 2
+SCRAPE_BACKOFF_BASE_SECONDS = 1.0
+
+# Espaciado mínimo entre solicitudes consecutivas a jumbo.cl
+jumbo_rate_limiter = DomainRateLimiter(int(os.getenv("JUMBO_DOMAIN_DELAY_MS", 1000)))
+
+# Cache de respuestas GET de marcas (se invalida al crear/actualizar/eliminar)
+brands_cache = ResponseCache(ttl=30, maxsize=512)
+_BRAND_LIST = TypeAdapter(List[BrandResponse])
+_BRAND_WITH_MANUFACTURER_LIST = TypeAdapter(List[BrandWithManufacturer])
+
+# Regex de slug precompilada
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+# Marca en session.info que get_or_create_category creó categorías; el cache
+# del árbol se invalida recién después del commit (invalidate_created_categories)
+_CATEGORY_CREATED_KEY = 'categories_created'
+
+
+# Palabra clave -> (prioridad, categoría); la prioridad es el orden en CATEGORY_KEYWORDS
+_KEYWORD_CATEGORY = {}
+for _priority, (_category_name, _keywords) in enumerate(CATEGORY_KEYWORDS.items()):
+    for _keyword in _keywords:
+        _KEYWORD_CATEGORY.setdefault(_keyword, (_priority, _category_name))
+
+# Alternación con lookahead: encuentra todas las palabras clave (incluso superpuestas)
+# en una sola pasada sobre el nombre
+_KEYWORD_RE = re.compile('(?=(' + '|'.join(re.escape(k) for k in _KEYWORD_CATEGORY) + '))')
+
+
+def _match_category_keyword(product_name_lower: str) -> Optional[str]:
+    """Retorna la categoría de mayor prioridad cuya palabra clave aparece en el nombre."""
+    matches = [_KEYWORD_CATEGORY[m.group(1)] for m in _KEYWORD_RE.finditer(product_name_lower)]
+    return min(matches)[1] if matches else None
 
-def get_or_create_category(db: Session, category_name: str) -> Category:
-    """Obtiene una categoría existente o la crea si no existe."""
-    slug = re.sub(r'[^a-z0-9]+', '-', category_name.lower()).strip('-')
+
+def load_category_cache(db: Session) -> Dict[str, Dict]:
+    """
+    Precarga todas las categorías indexadas por id, slug y nombre (minúsculas)
+    para resolverlas en memoria durante un lote de productos.
+    """
+    categories = db.query(Category).all()
+    return {
+        'by_id': {c.id: c for c in categories},
+        'by_slug': {c.slug: c for c in categories},
+        'by_name': {c.name.lower(): c for c in categories},
+    }
+
+
+def get_or_create_category(db: Session, category_name: str, category_cache: Dict[str, Dict] = None) -> Category:
+    """
+    Obtiene una categoría existente o la crea si no existe.
+    Si se entrega category_cache (ver load_category_cache), solo consulta la BD para crear.
+    """
+    slug = _SLUG_RE.sub('-', category_name.lower()).strip('-')
 
     # Buscar categoría existente por nombre o slug (case insensitive)
-    category = db.query(Category).filter(
-        (func.lower(Category.name) == category_name.lower()) |
-        (Category.slug == slug)
-    ).first()
+    if category_cache is not None:
+        category = category_cache['by_name'].get(category_name.lower()) or category_cache['by_slug'].get(slug)
+    else:
+        category = db.query(Category).filter(
+            (func.lower(Category.name) == category_name.lower()) |
+            (Category.slug == slug)
+        ).first()
 
     if not category:
         # Buscar parent "Dairy & Chilled Food" para categorías de lácteos
         parent_id = None
-        dairy_categories = ['yogurt', 'milk', 'cheese', 'butter & margarine', 'cream', 'desserts']
-        if category_name.lower() in dairy_categories:
-            dairy_parent = db.query(Category).filter(Category.slug == DAIRY_PARENT_SLUG).first()
+        if category_name.lower() in DAIRY_CATEGORIES:
+            if category_cache is not None:
+                dairy_parent = category_cache['by_slug'].get(DAIRY_PARENT_SLUG)
+            else:
+                dairy_parent = db.query(Category).filter(Category.slug == DAIRY_PARENT_SLUG).first()
             if dairy_parent:
                 parent_id = dairy_parent.id
 
@@ -65,16 +145,64 @@ def get_or_create_category(db: Session, category_name: str) -> Category:
         )
         db.add(category)
         db.flush()  # Para obtener el ID sin hacer commit
-        print(f"  [CAT] Nueva categoría creada: {category_name} (parent: {'Dairy' if parent_id else 'None'})")
+        db.info[_CATEGORY_CREATED_KEY] = True
+        logger.debug("[CAT] Nueva categoría creada: %s (parent: %s)", category_name, 'Dairy' if parent_id else 'None')
+
+        if category_cache is not None:
+            category_cache['by_id'][category.id] = category
+            category_cache['by_slug'][category.slug] = category
+            category_cache['by_name'][category.name.lower()] = category
 
     return category
 
 
-def detect_category_from_name(product_name: str, db: Session, brand_id: UUID = None) -> Optional[UUID]:
+def invalidate_created_categories(db) -> None:
+    """
+    Invalida el cache de categorías si la sesión creó alguna con
+    get_or_create_category. Llamar después del commit: invalidar antes deja
+    que un GET concurrente cachee el árbol sin la categoría nueva.
+    """
+    if db.info.pop(_CATEGORY_CREATED_KEY, False):
+        categories_cache.invalidate()
+
+
+def load_brand_product_index(db: Session, brand_id: UUID) -> List[Tuple[str, UUID, str]]:
+    """
+    Precarga los productos categorizados de una marca como lista ordenada de
+    (nombre en minúsculas, category_id, nombre) para búsquedas por prefijo en memoria.
+    """
+    rows = db.query(ProductCatalog.name, ProductCatalog.category_id).filter(
+        ProductCatalog.brand_id == brand_id,
+        ProductCatalog.category_id.isnot(None)
+    ).all()
+    return sorted((name.lower(), category_id, name) for name, category_id in rows)
+
+
+def _find_by_prefix(
+    brand_products: List[Tuple[str, UUID, str]],
+    prefix: str
+) -> Optional[Tuple[str, UUID, str]]:
+    """Busca (bisect) un producto cuyo nombre en minúsculas empiece con prefix."""
+    i = bisect_left(brand_products, (prefix,))
+    if i < len(brand_products) and brand_products[i][0].startswith(prefix):
+        return brand_products[i]
+    return None
+
+
+def detect_category_from_name(
+    product_name: str,
+    db: Session,
+    brand_id: UUID = None,
+    category_cache: Dict[str, Dict] = None,
+    brand_products: List[Tuple[str, UUID, str]] = None
+) -> Optional[UUID]:
     """
     Detecta la categoría de un producto basándose en:
     1. Productos similares de la misma marca
     2. Palabras clave en el nombre
+
+    Si se entrega brand_products (ver load_brand_product_index), el paso 1 se
+    resuelve en memoria sin consultar la BD.
     """
     product_name_lower = product_name.lower()
 
@@ -85,31 +213,172 @@ def detect_category_from_name(product_name: str, db: Session, brand_id: UUID = N
 
         for word in first_words:
             if len(word) > 3:  # Ignorar palabras muy cortas
+                if brand_products is not None:
+                    match = _find_by_prefix(brand_products, word.lower())
+                    if match:
+                        logger.debug("[CAT] Categoría inferida de producto similar: %s", match[2])
+                        return match[1]
+                    continue
+
+                # lower(name) LIKE 'x%' usa el índice (brand_id, lower(name) text_pattern_ops)
                 similar_product = db.query(ProductCatalog).filter(
                     ProductCatalog.brand_id == brand_id,
                     ProductCatalog.category_id.isnot(None),
-                    ProductCatalog.name.ilike(f"{word}%")
+                    func.lower(ProductCatalog.name).like(f"{word.lower()}%")
                 ).first()
 
                 if similar_product:
-                    print(f"  [CAT] Categoría inferida de producto similar: {similar_product.name}")
+                    logger.debug("[CAT] Categoría inferida de producto similar: %s", similar_product.name)
                     return similar_product.category_id
 
     # 2. Mapeo por palabras clave
-    for category_name, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in product_name_lower:
-                category = get_or_create_category(db, category_name)
-                return category.id
+    category_name = _match_category_keyword(product_name_lower)
+    if category_name:
+        category = get_or_create_category(db, category_name, category_cache)
+        return category.id
 
     return None
 
 
+async def _scrape_brand(brand_name: str) -> dict:
+    """
+    Ejecuta el scraper de Jumbo respetando el espaciado por dominio y
+    reintentando con backoff exponencial si el scraper falla.
+    """
+    for attempt in range(SCRAPE_MAX_RETRIES + 1):
+        await jumbo_rate_limiter.wait(JUMBO_DOMAIN)
+        try:
+            return await run_browser_scrape("jumbo", scrape_jumbo_catalog, brand_name)
+        except CircuitOpenError:
+            # Reintentar no sirve mientras el circuito esté abierto
+            raise
+        except Exception:
+            if attempt == SCRAPE_MAX_RETRIES:
+                raise
+            await asyncio.sleep(SCRAPE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+
+
+async def _create_catalog_products(db: AsyncSession, brand_name: str, products: List[dict]) -> dict:
+    """
+    Crea en products_catalog los productos scrapeados que aún no existen.
+
+    Returns:
+        dict con created_count, skipped_count y created_products
+    """
+    # Buscar o crear la marca
+    brand = (await db.execute(select(Brand).where(Brand.name.ilike(brand_name)))).scalars().first()
+    brand_id = brand.id if brand else None
+
+    if brand:
+        logger.debug("Marca encontrada: %s (ID: %s)", brand.name, brand.id)
+    else:
+        logger.info("Marca '%s' no encontrada en BD, productos se crearán sin brand_id", brand_name)
+
+    new_rows = []
+    pending_products = {}
+
+    # Categorías precargadas (evita SELECTs de categoría por producto)
+    category_cache = await db.run_sync(load_category_cache)
+
+    # Productos categorizados de la marca, para inferir categoría por prefijo en memoria
+    brand_products = None
+    if brand_id:
+        brand_products = await db.run_sync(
+            lambda session: load_brand_product_index(session, brand_id)
+        )
+
+    for product in products:
+        # Nombres repetidos en el mismo scraping
+        if product['name'] in pending_products:
+            continue
+
+        # Detectar categoría
+        # Los helpers de categoría son síncronos (compartidos con products.py)
+        category_id = await db.run_sync(
+            lambda session: detect_category_from_name(
+                product['name'], session, brand_id, category_cache, brand_products
+            )
+        )
+
+        # Acumular el producto para el INSERT multi-fila
+        new_rows.append({
+            'name': product['name'],
+            'sku': f"JUMBO-{product['jumbo_id']}",  # SKU basado en ID de Jumbo
+            'brand_id': brand_id,
+            'category_id': category_id,
+            'image_url': product.get('image_url'),
+            'attributes': {
+                'jumbo_id': product['jumbo_id'],
+                'jumbo_url': product['url'],
+                'jumbo_price': product['price'],
+                'source': 'jumbo_scraper'
+            },
+            'active': True
+        })
+
+        # Obtener nombre de categoría para el log
+        cat = category_cache['by_id'].get(category_id) if category_id else None
+
+        pending_products[product['name']] = {
+            'name': product['name'],
+            'sku': f"JUMBO-{product['jumbo_id']}",
+            'category': cat.name if cat else None
+        }
+
+    # INSERT ... ON CONFLICT (name) DO NOTHING: los que ya existen se omiten de forma
+    # atómica (seguro ante scrapings concurrentes de la misma marca)
+    inserted_names = set()
+    if new_rows:
+        stmt = (
+            pg_insert(ProductCatalog)
+            .on_conflict_do_nothing(index_elements=[ProductCatalog.name])
+            .returning(ProductCatalog.name)
+        )
+        inserted_names = set((await db.execute(stmt, new_rows)).scalars())
+    await db.commit()
+    if inserted_names:
+        ProductService.invalidate_catalog_cache()
+    invalidate_created_categories(db)
+
+    created_products = []
+    for name, created_product in pending_products.items():
+        if name in inserted_names:
+            created_products.append(created_product)
+            logger.debug("[NEW] Creado: %s -> Categoría: %s", name, created_product['category'] or 'Sin categoría')
+        else:
+            logger.debug("[SKIP] Ya existe: %s", name)
+
+    created_count = len(created_products)
+    skipped_count = len(products) - created_count
+
+    logger.info(
+        "Catálogo '%s': productos creados=%d, omitidos (ya existían)=%d",
+        brand_name, created_count, skipped_count
+    )
+
+    return {
+        'created_count': created_count,
+        'skipped_count': skipped_count,
+        'created_products': created_products,
+    }
+
+
+async def _create_catalog_products_task(brand_name: str, products: List[dict]) -> None:
+    """
+    Versión para BackgroundTasks: abre su propia sesión, ya que la sesión del
+    request se cierra antes de que corran las tareas en segundo plano.
+    """
+    async with AsyncSessionLocal() as db:
+        await _create_catalog_products(db, brand_name, products)
+
+
 @router.get("/brands/search")
 async def search_brand_catalog(
+    background_tasks: BackgroundTasks,
     q: str = Query(..., description="Nombre de la marca a buscar"),
     create_products: bool = Query(True, description="Crear productos en el catálogo automáticamente"),
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description="Crear los productos en segundo plano y responder apenas termine el scraping"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Busca productos de una marca en Jumbo.cl y opcionalmente los crea en el catálogo.
@@ -117,199 +386,185 @@ async def search_brand_catalog(
     Args:
         q: Nombre de la marca (ej: "Soprole", "Nestle")
         create_products: Si True, crea los productos encontrados en product_catalog
+        background: Si True, la creación se encola en BackgroundTasks y la respuesta
+            trae catalog_status='accepted' y pending_count en vez de los conteos finales
 
     Returns:
         dict: Estado del scraping, productos encontrados y creados
     """
-    print(f"\n=== BÚSQUEDA DE CATÁLOGO POR MARCA ===")
-    print(f"Marca: {q}")
-
-    # Importar el scraper de Jumbo
-    scraper_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), '../../../simplify-scraper')
-    )
-    if scraper_path not in sys.path:
-        sys.path.append(scraper_path)
-
-    from scrapers.jumbo_catalog import scrape_jumbo_catalog
+    if scrape_jumbo_catalog is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Jumbo scraper is not available"
+        )
 
     # Ejecutar scraping
-    result = await scrape_jumbo_catalog(q)
+    try:
+        result = await _scrape_brand(q)
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Jumbo scraping is temporarily unavailable"
+        )
 
-    print(f"Resultado: {result['status']}")
+    logger.info("Búsqueda de catálogo por marca '%s': %s", q, result['status'])
 
     # Si el scraping fue exitoso y se deben crear productos
     if result['status'] == 'success' and create_products and result.get('products'):
-        print(f"\n=== CREANDO PRODUCTOS EN CATÁLOGO ===")
+        if background:
+            background_tasks.add_task(_create_catalog_products_task, q, result['products'])
+            result['catalog_status'] = 'accepted'
+            result['pending_count'] = len(result['products'])
+        else:
+            result.update(await _create_catalog_products(db, q, result['products']))
 
-        # Buscar o crear la marca
-        brand = db.query(Brand).filter(Brand.name.ilike(q)).first()
-        brand_id = brand.id if brand else None
+    return result
 
-        if brand:
-            print(f"Marca encontrada: {brand.name} (ID: {brand.id})")
-        else:
-            print(f"Marca '{q}' no encontrada en BD, productos se crearán sin brand_id")
-
-        created_count = 0
-        skipped_count = 0
-        created_products = []
-
-        for product in result['products']:
-            # Verificar si el producto ya existe (por nombre exacto)
-            existing = db.query(ProductCatalog).filter(
-                ProductCatalog.name == product['name']
-            ).first()
-
-            if existing:
-                print(f"  [SKIP] Ya existe: {product['name']}")
-                skipped_count += 1
-                continue
-
-            # Detectar categoría
-            category_id = detect_category_from_name(product['name'], db, brand_id)
-
-            # Crear el producto
-            new_product = ProductCatalog(
-                name=product['name'],
-                sku=f"JUMBO-{product['jumbo_id']}",  # SKU basado en ID de Jumbo
-                brand_id=brand_id,
-                category_id=category_id,
-                image_url=product.get('image_url'),
-                attributes={
-                    'jumbo_id': product['jumbo_id'],
-                    'jumbo_url': product['url'],
-                    'jumbo_price': product['price'],
-                    'source': 'jumbo_scraper'
-                },
-                active=True
-            )
 
-            db.add(new_product)
-            created_count += 1
+@router.post("/brands/search/batch")
+async def search_brand_catalog_batch(
+    brands: List[str] = Body(..., min_length=1, description="Nombres de marcas a buscar"),
+    create_products: bool = Query(True, description="Crear productos en el catálogo automáticamente"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Busca productos de varias marcas en Jumbo.cl en paralelo.
+
+    El scraping corre concurrentemente (acotado por SCRAPE_BATCH_CONCURRENCY y
+    espaciado por JUMBO_DOMAIN_DELAY_MS); la creación en catálogo se hace después,
+    marca por marca, con la misma sesión.
 
-            # Obtener nombre de categoría para el log
-            cat_name = None
-            if category_id:
-                cat = db.query(Category).filter(Category.id == category_id).first()
-                cat_name = cat.name if cat else None
+    Returns:
+        dict: Resultado por marca (mismo formato que /brands/search, o error)
+    """
+    if scrape_jumbo_catalog is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Jumbo scraper is not available"
+        )
 
-            created_products.append({
-                'name': product['name'],
-                'sku': f"JUMBO-{product['jumbo_id']}",
-                'category': cat_name
-            })
-            print(f"  [NEW] Creado: {product['name']} -> Categoría: {cat_name or 'Sin categoría'}")
+    semaphore = asyncio.Semaphore(SCRAPE_BATCH_CONCURRENCY)
 
-        # Commit todos los productos
-        db.commit()
+    async def scrape(brand_name: str) -> dict:
+        async with semaphore:
+            return await _scrape_brand(brand_name)
 
-        print(f"\n=== RESUMEN ===")
-        print(f"Productos creados: {created_count}")
-        print(f"Productos omitidos (ya existían): {skipped_count}")
-        print(f"================================\n")
+    scraped = await asyncio.gather(*(scrape(name) for name in brands), return_exceptions=True)
 
-        # Agregar info al resultado
-        result['created_count'] = created_count
-        result['skipped_count'] = skipped_count
-        result['created_products'] = created_products
+    results = []
+    for brand_name, result in zip(brands, scraped):
+        if isinstance(result, Exception):
+            results.append({'brand': brand_name, 'status': 'error', 'error': str(result)})
+            continue
 
-    return result
+        if result['status'] == 'success' and create_products and result.get('products'):
+            result.update(await _create_catalog_products(db, brand_name, result['products']))
+
+        results.append({'brand': brand_name, **result})
+
+    return {'results': results}
 
 
 @router.get("/brands", response_model=List[BrandResponse])
-def get_brands(
+async def get_brands(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = False,
     search: Optional[str] = Query(None, description="Search by brand name"),
     manufacturer_id: Optional[UUID] = Query(None, description="Filter by manufacturer"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all brands with optional filters
     """
-    query = db.query(Brand)
-    
-    if active_only:
-        query = query.filter(Brand.active == True)
+    cache_key = ("brands", skip, limit, active_only, search, manufacturer_id)
+    cached = brands_cache.get(cache_key)
+    if cached is None:
+        version = brands_cache.version
+        query = select(Brand).options(*list_load_options())
+        
+        if active_only:
+            query = query.where(Brand.active == True)
+        
+        if search:
+            query = query.where(Brand.name.ilike(f"%{search}%"))
+        
+        if manufacturer_id:
+            query = query.where(Brand.manufacturer_id == manufacturer_id)
+        
+        result = await db.execute(query.offset(skip).limit(limit))
+        brands = _BRAND_LIST.validate_python(result.scalars().all(), from_attributes=True)
+        cached = brands_cache.set(cache_key, _BRAND_LIST.dump_json(brands), version)
     
-    if search:
-        query = query.filter(Brand.name.ilike(f"%{search}%"))
-    
-    if manufacturer_id:
-        query = query.filter(Brand.manufacturer_id == manufacturer_id)
-    
-    brands = query.offset(skip).limit(limit).all()
-    return brands
+    return etag_response(request, *cached)
 
 
 @router.get("/brands/with-manufacturer", response_model=List[BrandWithManufacturer])
-def get_brands_with_manufacturer(
+async def get_brands_with_manufacturer(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all brands with manufacturer information
     """
-    query = db.query(Brand).options(joinedload(Brand.manufacturer))
-    
-    if active_only:
-        query = query.filter(Brand.active == True)
+    cache_key = ("brands/with-manufacturer", skip, limit, active_only)
+    cached = brands_cache.get(cache_key)
+    if cached is None:
+        version = brands_cache.version
+        query = select(Brand).options(*list_load_options(joinedload(Brand.manufacturer)))
+        
+        if active_only:
+            query = query.where(Brand.active == True)
+        
+        # BrandWithManufacturer lee manufacturer_name/country del manufacturer ya cargado
+        result = await db.execute(query.offset(skip).limit(limit))
+        brands = _BRAND_WITH_MANUFACTURER_LIST.validate_python(result.scalars().all(), from_attributes=True)
+        cached = brands_cache.set(cache_key, _BRAND_WITH_MANUFACTURER_LIST.dump_json(brands), version)
     
-    brands = query.offset(skip).limit(limit).all()
-    
-    # Transform to include manufacturer info
-    result = []
-    for brand in brands:
-        brand_dict = {
-            "id": brand.id,
-            "name": brand.name,
-            "manufacturer_id": brand.manufacturer_id,
-            "active": brand.active,
-            "product_count": brand.product_count,
-            "logo_url": brand.logo_url,
-            "created_at": brand.created_at,
-            "updated_at": brand.updated_at,
-            "manufacturer_name": brand.manufacturer.name if brand.manufacturer else None,
-            "manufacturer_country": brand.manufacturer.country if brand.manufacturer else None,
-        }
-        result.append(brand_dict)
-    
-    return result
+    return etag_response(request, *cached)
 
 
 @router.get("/brands/{brand_id}", response_model=BrandResponse)
-def get_brand(
+async def get_brand(
+    request: Request,
     brand_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific brand by ID
     """
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
-    
-    if not brand:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Brand with id {brand_id} not found"
-        )
+    cache_key = ("brand", brand_id)
+    cached = brands_cache.get(cache_key)
+    if cached is None:
+        version = brands_cache.version
+        brand = (await db.execute(select(Brand).where(Brand.id == brand_id))).scalar_one_or_none()
+        
+        if not brand:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Brand with id {brand_id} not found"
+            )
+        
+        body = BrandResponse.model_validate(brand).model_dump_json().encode()
+        cached = brands_cache.set(cache_key, body, version)
     
-    return brand
+    return etag_response(request, *cached)
 
 
 @router.post("/brands", response_model=BrandResponse, status_code=status.HTTP_201_CREATED)
-def create_brand(
+async def create_brand(
     brand: BrandCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new brand
     """
     # Check if name already exists
-    existing = db.query(Brand).filter(Brand.name == brand.name).first()
+    existing = (await db.execute(select(Brand).where(Brand.name == brand.name))).scalar_one_or_none()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -318,7 +573,9 @@ def create_brand(
     
     # If manufacturer_id is provided, verify it exists
     if brand.manufacturer_id:
-        manufacturer = db.query(Manufacturer).filter(Manufacturer.id == brand.manufacturer_id).first()
+        manufacturer = (await db.execute(
+            select(Manufacturer).where(Manufacturer.id == brand.manufacturer_id)
+        )).scalar_one_or_none()
         if not manufacturer:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -328,22 +585,23 @@ def create_brand(
     # Create new brand
     db_brand = Brand(**brand.model_dump())
     db.add(db_brand)
-    db.commit()
-    db.refresh(db_brand)
+    await db.commit()
+    brands_cache.invalidate()
+    await db.refresh(db_brand)
     
     return db_brand
 
 
 @router.put("/brands/{brand_id}", response_model=BrandResponse)
-def update_brand(
+async def update_brand(
     brand_id: UUID,
     brand: BrandUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a brand
     """
-    db_brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    db_brand = (await db.execute(select(Brand).where(Brand.id == brand_id))).scalar_one_or_none()
     
     if not db_brand:
         raise HTTPException(
@@ -353,7 +611,7 @@ def update_brand(
     
     # Check if new name conflicts with existing brand
     if brand.name and brand.name != db_brand.name:
-        existing = db.query(Brand).filter(Brand.name == brand.name).first()
+        existing = (await db.execute(select(Brand).where(Brand.name == brand.name))).scalar_one_or_none()
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -362,7 +620,9 @@ def update_brand(
     
     # If manufacturer_id is being updated, verify it exists
     if brand.manufacturer_id is not None:
-        manufacturer = db.query(Manufacturer).filter(Manufacturer.id == brand.manufacturer_id).first()
+        manufacturer = (await db.execute(
+            select(Manufacturer).where(Manufacturer.id == brand.manufacturer_id)
+        )).scalar_one_or_none()
         if not manufacturer:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -374,21 +634,22 @@ def update_brand(
     for field, value in update_data.items():
         setattr(db_brand, field, value)
     
-    db.commit()
-    db.refresh(db_brand)
+    await db.commit()
+    brands_cache.invalidate()
+    await db.refresh(db_brand)
     
     return db_brand
 
 
 @router.delete("/brands/{brand_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_brand(
+async def delete_brand(
     brand_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a brand
     """
-    db_brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    db_brand = (await db.execute(select(Brand).where(Brand.id == brand_id))).scalar_one_or_none()
     
     if not db_brand:
         raise HTTPException(
@@ -403,7 +664,8 @@ def delete_brand(
             detail=f"Cannot delete brand '{db_brand.name}' because it has {db_brand.product_count} associated products. Please deactivate it instead."
         )
     
-    db.delete(db_brand)
-    db.commit()
+    await db.delete(db_brand)
+    await db.commit()
+    brands_cache.invalidate()
     
     return None
@@ -1,58 +1,107 @@
 """
 Categories API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, func, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_async_db, list_load_options
+from app.core.errors import raise_integrity_error
+from app.core.pagination import paginate, set_next_cursor
+from app.core.response_cache import ResponseCache, etag_response
 from app.models.category import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryWithChildren
 
 router = APIRouter()
 
+# El árbol de categorías cambia poco: cache en proceso + ETag (304 para clientes
+# que ya tienen la versión). Se invalida en cada escritura de categorías.
+categories_cache = ResponseCache(ttl=60)
+_CATEGORY_TREE = TypeAdapter(List[CategoryWithChildren])
+# Serialización de listas en un solo paso con pydantic-core (sin el pipeline de response_model)
+_CATEGORY_LIST = TypeAdapter(List[CategoryResponse])
+
+
+def _category_constraint_errors(category) -> dict:
+    """Mensajes de error por constraint para create/update de categorías"""
+    return {
+        "slug": (
+            status.HTTP_400_BAD_REQUEST,
+            f"Category with slug '{category.slug}' already exists"
+        ),
+        "parent_id": (
+            status.HTTP_404_NOT_FOUND,
+            f"Parent category with id {category.parent_id} not found"
+        ),
+    }
+
 
 @router.get("/categories", response_model=List[CategoryResponse])
-def get_categories(
-    skip: int = 0,
+async def get_categories(
+    skip: int = Query(0, deprecated=True, description="Deprecated: use cursor"),
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all categories
     """
-    query = db.query(Category)
+    query = select(Category).options(*list_load_options())
     
     if active_only:
-        query = query.filter(Category.active == True)
-    
-    categories = query.offset(skip).limit(limit).all()
-    return categories
+        query = query.where(Category.active == True)
+    
+    query = paginate(query, Category, cursor, skip)
+    result = await db.execute(query.limit(limit))
+    categories = result.scalars().all()
+    response = Response(
+        content=_CATEGORY_LIST.dump_json(_CATEGORY_LIST.validate_python(categories, from_attributes=True)),
+        media_type="application/json"
+    )
+    set_next_cursor(response, categories, limit)
+    return response
 
 
 @router.get("/categories/tree", response_model=List[CategoryWithChildren])
-def get_categories_tree(
-    db: Session = Depends(get_db)
+async def get_categories_tree(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get categories as a tree structure (only root categories with their children)
     """
-    # Get only root categories (parent_id is NULL)
-    root_categories = db.query(Category).filter(Category.parent_id == None).all()
-    return root_categories
+    cache_key = ("tree",)
+    cached = categories_cache.get(cache_key)
+    if cached is None:
+        version = categories_cache.version
+        # Get only root categories (parent_id is NULL); el árbol completo se carga
+        # con selectinload recursivo porque AsyncSession no permite lazy loads
+        result = await db.execute(
+            select(Category)
+            .where(Category.parent_id == None)
+            .options(*list_load_options(selectinload(Category.children, recursion_depth=-1)))
+        )
+        tree = _CATEGORY_TREE.validate_python(result.scalars().all(), from_attributes=True)
+        cached = categories_cache.set(cache_key, _CATEGORY_TREE.dump_json(tree), version)
+    
+    return etag_response(request, *cached)
 
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
-def get_category(
+async def get_category(
     category_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific category by ID
     """
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = (await db.execute(select(Category).where(Category.id == category_id))).scalar_one_or_none()
     
     if not category:
         raise HTTPException(
@@ -64,49 +113,37 @@ def get_category(
 
 
 @router.post("/categories", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category: CategoryCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new category
     """
-    # Check if slug already exists
-    existing = db.query(Category).filter(Category.slug == category.slug).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Category with slug '{category.slug}' already exists"
-        )
-    
-    # If parent_id is provided, verify it exists
-    if category.parent_id:
-        parent = db.query(Category).filter(Category.id == category.parent_id).first()
-        if not parent:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Parent category with id {category.parent_id} not found"
-            )
-    
-    # Create new category
+    # Create new category (slug duplicado / parent inexistente los detecta la BD)
     db_category = Category(**category.model_dump())
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _category_constraint_errors(category))
+    categories_cache.invalidate()
+    await db.refresh(db_category)
     
     return db_category
 
 
 @router.put("/categories/{category_id}", response_model=CategoryResponse)
-def update_category(
+async def update_category(
     category_id: UUID,
     category: CategoryUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a category
     """
-    db_category = db.query(Category).filter(Category.id == category_id).first()
+    db_category = (await db.execute(select(Category).where(Category.id == category_id))).scalar_one_or_none()
     
     if not db_category:
         raise HTTPException(
@@ -114,49 +151,38 @@ def update_category(
             detail=f"Category with id {category_id} not found"
         )
     
-    # Check if new slug conflicts with existing category
-    if category.slug and category.slug != db_category.slug:
-        existing = db.query(Category).filter(Category.slug == category.slug).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Category with slug '{category.slug}' already exists"
-            )
-    
-    # If parent_id is being updated, verify it exists and prevent circular reference
-    if category.parent_id is not None:
-        if category.parent_id == category_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category cannot be its own parent"
-            )
-        parent = db.query(Category).filter(Category.id == category.parent_id).first()
-        if not parent:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Parent category with id {category.parent_id} not found"
-            )
+    # Prevent circular reference (slug duplicado / parent inexistente los detecta la BD)
+    if category.parent_id is not None and category.parent_id == category_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category cannot be its own parent"
+        )
     
     # Update category
     update_data = category.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_category, key, value)
     
-    db.commit()
-    db.refresh(db_category)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _category_constraint_errors(category))
+    categories_cache.invalidate()
+    await db.refresh(db_category)
     
     return db_category
 
 
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     category_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a category
     """
-    db_category = db.query(Category).filter(Category.id == category_id).first()
+    db_category = (await db.execute(select(Category).where(Category.id == category_id))).scalar_one_or_none()
     
     if not db_category:
         raise HTTPException(
@@ -164,15 +190,21 @@ def delete_category(
             detail=f"Category with id {category_id} not found"
         )
     
-    # Check if category has children
-    children_count = db.query(Category).filter(Category.parent_id == category_id).count()
-    if children_count > 0:
+    # Check if category has children (EXISTS; el conteo solo para el mensaje de error)
+    has_children = (await db.execute(
+        select(exists().where(Category.parent_id == category_id))
+    )).scalar()
+    if has_children:
+        children_count = (await db.execute(
+            select(func.count()).select_from(Category).where(Category.parent_id == category_id)
+        )).scalar_one()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot delete category with {children_count} subcategories. Delete or reassign them first."
         )
     
-    db.delete(db_category)
-    db.commit()
+    await db.delete(db_category)
+    await db.commit()
+    categories_cache.invalidate()
     
     return None
@@ -1,85 +1,124 @@
 """
 Manufacturers API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, func, exists, cast, literal_column, Text
 from typing import List, Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_async_db, list_load_options
+from app.core.errors import raise_integrity_error
+from app.core.pagination import paginate, set_next_cursor
 from app.models.manufacturer import Manufacturer
 from app.models.brand import Brand
 from app.schemas.manufacturer import ManufacturerCreate, ManufacturerUpdate, ManufacturerResponse, ManufacturerWithBrands
 
 router = APIRouter()
 
+# Serialización de listas en un solo paso con pydantic-core (sin el pipeline de response_model)
+_MANUFACTURER_LIST = TypeAdapter(List[ManufacturerResponse])
+
+
+def _manufacturer_constraint_errors(manufacturer) -> dict:
+    """Mensajes de error por constraint para create/update de fabricantes"""
+    return {
+        "tax_id": (
+            status.HTTP_400_BAD_REQUEST,
+            f"Manufacturer with tax ID '{manufacturer.tax_id}' already exists"
+        ),
+        "name": (
+            status.HTTP_400_BAD_REQUEST,
+            f"Manufacturer with name '{manufacturer.name}' already exists"
+        ),
+    }
+
 
 @router.get("/manufacturers", response_model=List[ManufacturerResponse])
-def get_manufacturers(
-    skip: int = 0,
+async def get_manufacturers(
+    skip: int = Query(0, deprecated=True, description="Deprecated: use cursor"),
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     search: Optional[str] = Query(None, description="Search by manufacturer name"),
     country: Optional[str] = Query(None, description="Filter by country"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all manufacturers with optional filters
     """
-    query = db.query(Manufacturer)
+    query = select(Manufacturer).options(*list_load_options())
     
     if search:
-        query = query.filter(Manufacturer.name.ilike(f"%{search}%"))
+        query = query.where(Manufacturer.name.ilike(f"%{search}%"))
     
     if country:
-        query = query.filter(Manufacturer.country.ilike(f"%{country}%"))
-    
-    manufacturers = query.offset(skip).limit(limit).all()
-    return manufacturers
+        query = query.where(Manufacturer.country.ilike(f"%{country}%"))
+    
+    query = paginate(query, Manufacturer, cursor, skip)
+    result = await db.execute(query.limit(limit))
+    manufacturers = result.scalars().all()
+    response = Response(
+        content=_MANUFACTURER_LIST.dump_json(_MANUFACTURER_LIST.validate_python(manufacturers, from_attributes=True)),
+        media_type="application/json"
+    )
+    set_next_cursor(response, manufacturers, limit)
+    return response
 
 
 @router.get("/manufacturers/with-brands", response_model=List[ManufacturerWithBrands])
-def get_manufacturers_with_brands(
-    skip: int = 0,
+async def get_manufacturers_with_brands(
+    skip: int = Query(0, deprecated=True, description="Deprecated: use cursor"),
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all manufacturers with brand count
     """
-    manufacturers = db.query(
-        Manufacturer,
-        func.count(Brand.id).label('brand_count')
-    ).outerjoin(Brand).group_by(Manufacturer.id).offset(skip).limit(limit).all()
-    
-    result = []
-    for manufacturer, brand_count in manufacturers:
-        manufacturer_dict = {
-            "id": manufacturer.id,
-            "name": manufacturer.name,
-            "tax_id": manufacturer.tax_id,
-            "country": manufacturer.country,
-            "website": manufacturer.website,
-            "main_business_line": manufacturer.main_business_line,
-            "logo_url": manufacturer.logo_url,
-            "created_at": manufacturer.created_at,
-            "updated_at": manufacturer.updated_at,
-            "brand_count": brand_count,
-        }
-        result.append(manufacturer_dict)
-    
-    return result
+    # Postgres arma el JSON de cada fabricante; Python solo concatena las filas
+    fields = {
+        'id': Manufacturer.id,
+        'name': Manufacturer.name,
+        'tax_id': Manufacturer.tax_id,
+        'country': Manufacturer.country,
+        'website': Manufacturer.website,
+        'main_business_line': Manufacturer.main_business_line,
+        'logo_url': Manufacturer.logo_url,
+        'created_at': Manufacturer.created_at,
+        'updated_at': Manufacturer.updated_at,
+        'brand_count': func.count(Brand.id),
+    }
+    # Claves como literales SQL: un parámetro sin tipo no sirve para el VARIADIC "any"
+    data = func.jsonb_build_object(
+        *(arg for key, column in fields.items() for arg in (literal_column(f"'{key}'"), column))
+    )
+    query = select(
+        cast(data, Text).label('data'),
+        Manufacturer.created_at,
+        Manufacturer.id
+    ).select_from(Manufacturer).outerjoin(Brand).group_by(Manufacturer.id)
+    query = paginate(query, Manufacturer, cursor, skip)
+    rows = (await db.execute(query.limit(limit))).all()
+    
+    response = Response(
+        content="[" + ",".join(row.data for row in rows) + "]",
+        media_type="application/json"
+    )
+    set_next_cursor(response, rows, limit)
+    return response
 
 
 @router.get("/manufacturers/{manufacturer_id}", response_model=ManufacturerResponse)
-def get_manufacturer(
+async def get_manufacturer(
     manufacturer_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific manufacturer by ID
     """
-    manufacturer = db.query(Manufacturer).filter(Manufacturer.id == manufacturer_id).first()
+    manufacturer = (await db.execute(select(Manufacturer).where(Manufacturer.id == manufacturer_id))).scalar_one_or_none()
     
     if not manufacturer:
         raise HTTPException(
@@ -91,49 +130,36 @@ def get_manufacturer(
 
 
 @router.post("/manufacturers", response_model=ManufacturerResponse, status_code=status.HTTP_201_CREATED)
-def create_manufacturer(
+async def create_manufacturer(
     manufacturer: ManufacturerCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new manufacturer
     """
-    # Check if name already exists
-    existing = db.query(Manufacturer).filter(Manufacturer.name == manufacturer.name).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Manufacturer with name '{manufacturer.name}' already exists"
-        )
-    
-    # Check if tax_id already exists (if provided)
-    if manufacturer.tax_id:
-        existing_tax = db.query(Manufacturer).filter(Manufacturer.tax_id == manufacturer.tax_id).first()
-        if existing_tax:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Manufacturer with tax ID '{manufacturer.tax_id}' already exists"
-            )
-    
-    # Create new manufacturer
+    # Create new manufacturer (name / tax_id duplicados los detecta la BD)
     db_manufacturer = Manufacturer(**manufacturer.model_dump())
     db.add(db_manufacturer)
-    db.commit()
-    db.refresh(db_manufacturer)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _manufacturer_constraint_errors(manufacturer))
+    await db.refresh(db_manufacturer)
     
     return db_manufacturer
 
 
 @router.put("/manufacturers/{manufacturer_id}", response_model=ManufacturerResponse)
-def update_manufacturer(
+async def update_manufacturer(
     manufacturer_id: UUID,
     manufacturer: ManufacturerUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a manufacturer
     """
-    db_manufacturer = db.query(Manufacturer).filter(Manufacturer.id == manufacturer_id).first()
+    db_manufacturer = (await db.execute(select(Manufacturer).where(Manufacturer.id == manufacturer_id))).scalar_one_or_none()
     
     if not db_manufacturer:
         raise HTTPException(
@@ -141,44 +167,30 @@ def update_manufacturer(
             detail=f"Manufacturer with id {manufacturer_id} not found"
         )
     
-    # Check if new name conflicts with existing manufacturer
-    if manufacturer.name and manufacturer.name != db_manufacturer.name:
-        existing = db.query(Manufacturer).filter(Manufacturer.name == manufacturer.name).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Manufacturer with name '{manufacturer.name}' already exists"
-            )
-    
-    # Check if new tax_id conflicts with existing manufacturer
-    if manufacturer.tax_id and manufacturer.tax_id != db_manufacturer.tax_id:
-        existing_tax = db.query(Manufacturer).filter(Manufacturer.tax_id == manufacturer.tax_id).first()
-        if existing_tax:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Manufacturer with tax ID '{manufacturer.tax_id}' already exists"
-            )
-    
-    # Update fields
+    # Update fields (name / tax_id duplicados los detecta la BD)
     update_data = manufacturer.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_manufacturer, field, value)
     
-    db.commit()
-    db.refresh(db_manufacturer)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _manufacturer_constraint_errors(manufacturer))
+    await db.refresh(db_manufacturer)
     
     return db_manufacturer
 
 
 @router.delete("/manufacturers/{manufacturer_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_manufacturer(
+async def delete_manufacturer(
     manufacturer_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a manufacturer
     """
-    db_manufacturer = db.query(Manufacturer).filter(Manufacturer.id == manufacturer_id).first()
+    db_manufacturer = (await db.execute(select(Manufacturer).where(Manufacturer.id == manufacturer_id))).scalar_one_or_none()
     
     if not db_manufacturer:
         raise HTTPException(
@@ -186,15 +198,20 @@ def delete_manufacturer(
             detail=f"Manufacturer with id {manufacturer_id} not found"
         )
     
-    # Check if manufacturer has brands
-    brand_count = db.query(Brand).filter(Brand.manufacturer_id == manufacturer_id).count()
-    if brand_count > 0:
+    # Check if manufacturer has brands (EXISTS; el conteo solo para el mensaje de error)
+    has_brands = (await db.execute(
+        select(exists().where(Brand.manufacturer_id == manufacturer_id))
+    )).scalar()
+    if has_brands:
+        brand_count = (await db.execute(
+            select(func.count()).select_from(Brand).where(Brand.manufacturer_id == manufacturer_id)
+        )).scalar_one()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot delete manufacturer '{db_manufacturer.name}' because it has {brand_count} associated brand(s). Please remove or reassign the brands first."
         )
     
-    db.delete(db_manufacturer)
-    db.commit()
+    await db.delete(db_manufacturer)
+    await db.commit()
     
     return None
@@ -1,19 +1,88 @@
 """
 Endpoints para búsqueda inteligente de productos
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.breaker import CircuitOpenError
+from app.core.rate_limit import run_browser_scrape
 from app.schemas.product import ProductSearchResult, ProductWithPrice
 from app.services.product_service import ProductService
-from app.api.brands import detect_category_from_name
-import sys
-import os
-from decimal import Decimal
+from app.api.brands import detect_category_from_name, invalidate_created_categories
+import app.core.scraper_path  # noqa: F401 - agrega simplify-scraper al sys.path
+from decimal import Decimal, InvalidOperation
+import asyncio
+import logging
 import re
 
+try:
+    from scrapers.google_shopping import scrape_google_shopping
+except ImportError:  # simplify-scraper no instalado junto a la API
+    scrape_google_shopping = None
+
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Filas por partición al streamear GET /products (server-side cursor)
+PRODUCTS_STREAM_YIELD_PER = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# GET /products: sentencia a nivel de módulo, se construye una sola vez por
+# proceso y SQLAlchemy reutiliza su forma compilada en cada request
+_ALL_PRODUCTS_QUERY = text("""
+    SELECT 
+        p.id,
+        p.catalog_id,
+        p.store_id,
+        p.url,
+        p.current_price,
+        p.active,
+        p.created_at,
+        p.updated_at,
+        p.last_scraped_at,
+        p.category_id,
+        -- Store info
+        s.name as store_name,
+        s.active as store_active,
+        -- Catalog info
+        pc.name as catalog_name,
+        pc.sku as catalog_sku,
+        -- Brand info
+        b.name as brand_name,
+        -- Category info
+        c.name as category_name,
+        -- Price info
+        pr.id as price_id,
+        pr.price,
+        pr.original_price,
+        pr.discount_percentage,
+        pr.currency,
+        pr.in_stock,
+        pr.created_at as price_created_at,
+        pr.updated_at as price_updated_at
+    FROM products p
+    LEFT JOIN stores s ON p.store_id = s.id
+    LEFT JOIN products_catalog pc ON p.catalog_id = pc.id
+    LEFT JOIN brands b ON pc.brand_id = b.id
+    LEFT JOIN categories c ON p.category_id = c.id
+    LEFT JOIN prices pr ON pr.product_id = p.id
+    WHERE p.active = true
+    ORDER BY 
+        pc.name,
+        s.active DESC,
+        pr.price ASC NULLS LAST
+""")
+
+
+# Precompilados una vez: tablas de traducción para separadores y el formato
+# numérico que Decimal acepta sin pasar por la excepción
+_DROP_DOLLAR = str.maketrans('', '', '$')
+_DROP_DOTS_COMMA_DECIMAL = str.maketrans({'.': None, ',': '.'})
+_DROP_COMMAS = str.maketrans('', '', ',')
+_DROP_DOTS = str.maketrans('', '', '.')
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
 
 
 def parse_price(price_str: str) -> Decimal:
@@ -23,32 +92,50 @@ def parse_price(price_str: str) -> Decimal:
     - "$1.990" -> 1990
     - "CLP 1,090" -> 1090
     - "$1.990,50" -> 1990.50
+    - "19.90" -> 19.90
+    
+    Con punto y coma, el punto es de miles y la coma decimal. Solo coma: es
+    separador de miles (formato chileno, "19,90" -> 1990). Solo un punto con
+    3 dígitos después: miles; si no, decimal ("1.9900" -> 1.9900).
+    
+    >>> parse_price("$1.990")
+    Decimal('1990')
+    >>> parse_price("CLP 1,090")
+    Decimal('1090')
+    >>> parse_price("$1.990,50")
+    Decimal('1990.50')
+    >>> parse_price("19.90")
+    Decimal('19.90')
+    >>> parse_price("19,90")
+    Decimal('1990')
+    >>> parse_price("1.9900")
+    Decimal('1.9900')
+    >>> parse_price("Agotado")
+    Decimal('0')
     """
     if not price_str:
         return Decimal("0")
     
     # Remover "CLP" y símbolos de moneda
-    cleaned = price_str.replace('CLP', '').replace('$', '').strip()
+    cleaned = price_str.replace('CLP', '').translate(_DROP_DOLLAR).strip()
     
-    # Detectar formato: si tiene punto Y coma, el punto es separador de miles
     if '.' in cleaned and ',' in cleaned:
         # Formato: 1.990,50 -> remover puntos, coma es decimal
-        cleaned = cleaned.replace('.', '').replace(',', '.')
+        cleaned = cleaned.translate(_DROP_DOTS_COMMA_DECIMAL)
     elif ',' in cleaned:
         # Formato chileno: 1,090 -> remover coma (es separador de miles)
-        cleaned = cleaned.replace(',', '')
-    elif '.' in cleaned:
-        # Verificar si el punto es separador de miles o decimal
-        # Si hay más de 3 dígitos después del punto, es separador de miles
-        parts = cleaned.split('.')
-        if len(parts) == 2 and len(parts[1]) == 3:
-            # Es separador de miles: 1.990 -> 1990
-            cleaned = cleaned.replace('.', '')
-        # Si son 1-2 dígitos, es decimal: 19.90 -> 19.90
+        cleaned = cleaned.translate(_DROP_COMMAS)
+    elif cleaned.count('.') == 1 and len(cleaned) - cleaned.index('.') == 4:
+        # Un solo punto con 3 dígitos después: separador de miles (1.990 -> 1990)
+        cleaned = cleaned.translate(_DROP_DOTS)
     
+    # Camino normal sin excepción; el resto (signo, exponente, basura) lo
+    # decide Decimal como antes
+    if _NUMBER_RE.fullmatch(cleaned):
+        return Decimal(cleaned)
     try:
         return Decimal(cleaned)
-    except:
+    except InvalidOperation:
         return Decimal("0")
 
 
@@ -74,21 +161,20 @@ async def search_product(
     Returns:
         ProductSearchResult con productos y precios por tienda
     """
-    print(f"\n=== BÚSQUEDA INTELIGENTE ===")
-    print(f"Query: {q}")
+    logger.debug("Búsqueda inteligente: %s", q)
     
     # 1. Buscar en products_catalog
     catalog_product = ProductService.search_catalog_by_name(db, q)
     
     if not catalog_product:
-        print(f"⚠️  Producto no encontrado en catálogo, creando entrada automática...")
+        logger.debug("Producto no encontrado en catálogo, creando entrada automática")
         detected_category = detect_category_from_name(q, db)
         catalog_product = ProductService.create_catalog_product(
             db, name=q, category_id=detected_category
         )
-        print(f"✅ Creado en catálogo: {catalog_product['name']}")
+        logger.debug("Creado en catálogo: %s", catalog_product['name'])
     
-    print(f"✅ Encontrado en catálogo: {catalog_product['name']}")
+    logger.debug("Encontrado en catálogo: %s", catalog_product['name'])
 
     # Si el catálogo no tiene categoría, detectarla y persistirla
     if not catalog_product.get('category_id'):
@@ -96,15 +182,14 @@ async def search_product(
             catalog_product['name'], db, catalog_product.get('brand_id')
         )
         if detected:
-            db.execute(
-                text("UPDATE products_catalog SET category_id = :cat WHERE id = :id"),
-                {"cat": str(detected), "id": str(catalog_product['id'])}
-            )
-            db.commit()
+            ProductService.set_catalog_category(db, catalog_product['id'], detected)
             catalog_product['category_id'] = detected
-            print(f"✅ Categoría detectada y guardada: {detected}")
+            logger.debug("Categoría detectada y guardada: %s", detected)
         else:
-            print(f"⚠️  No se pudo detectar categoría para: {catalog_product['name']}")
+            logger.debug("No se pudo detectar categoría para: %s", catalog_product['name'])
+    
+    # Las categorías creadas al detectar ya quedaron confirmadas por los commits de arriba
+    invalidate_created_categories(db)
 
     # 2. Buscar precios scrapeados
     existing_products = ProductService.get_products_by_catalog_id(
@@ -116,69 +201,88 @@ async def search_product(
     
     # 3. Si no hay productos scrapeados, activar scraper
     if not existing_products:
-        print(f"⚠️  No hay precios scrapeados, activando Google Shopping...")
+        logger.debug("No hay precios scrapeados, activando Google Shopping")
         
-        # Importar el scraper
-        scraper_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), '../../../simplify-scraper')
-        )
-        if scraper_path not in sys.path:
-            sys.path.append(scraper_path)
-        
-        from scrapers.google_shopping import scrape_google_shopping
+        if scrape_google_shopping is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Google Shopping scraper is not available"
+            )
         
-        # Ejecutar scraping
-        scraping_results = await scrape_google_shopping(catalog_product['name'])
+        # Ejecutar scraping. Antes se libera la conexión: el scraping tarda
+        # segundos y no usa la BD; la sesión toma otra del pool al volver a usarse
+        db.close()
+        try:
+            scraping_results = await run_browser_scrape("google_shopping", scrape_google_shopping, catalog_product['name'])
+        except asyncio.TimeoutError:
+            # Sin resultados: se responde con el catálogo y sin precios
+            logger.warning("Timeout scrapeando Google Shopping: %s", catalog_product['name'])
+            scraping_results = []
+        except CircuitOpenError:
+            logger.warning("Google Shopping en circuito abierto, se omite el scraping: %s", catalog_product['name'])
+            scraping_results = []
         
-        print(f"📦 Resultados del scraping: {len(scraping_results)} tiendas")
+        logger.debug("Resultados del scraping: %d tiendas", len(scraping_results))
         
-        # 4. Guardar resultados en la BD
+        # 4. Guardar resultados en la BD: se resuelven las tiendas y se
+        # hace un único upsert en bloque de products + prices, todo en una
+        # sola transacción (un commit al final)
+        found = []
         for result in scraping_results:
             if not result['encontrado']:
                 continue
             
-            # Buscar o crear la tienda automáticamente
-            store = ProductService.get_store_by_name_or_create(
-                db, 
-                result['retailer'],
-                result['url']
-            )
-            
             # Parsear precio
             price = parse_price(result['precio'])
             
             if price <= 0:
-                print(f"⚠️  Precio inválido para {result['retailer']}: {result['precio']}")
+                logger.warning("Precio inválido para %s: %s", result['retailer'], result['precio'])
                 continue
             
-            # Crear producto
-            product = ProductService.create_product(
-                db=db,
-                catalog_id=catalog_product['id'],
-                store_id=store['id'],
-                url=result['url'],
-                price=price
-            )
-            
-            print(f"✅ Guardado: {store['name']} - ${price}")
-            
-            # Crear/actualizar precio
-            ProductService.create_or_update_price(
-                db=db,
-                product_id=product['id'],
-                price=price,
-                in_stock=True
-            )
+            found.append((result, price))
         
-        # Volver a buscar los productos ahora que están guardados
-        existing_products = ProductService.get_products_by_catalog_id(
+        # Buscar o crear todas las tiendas de una vez (no una consulta por vendedor);
+        # sin commit: las tiendas nuevas se confirman junto con el upsert
+        store_by_retailer = ProductService.get_stores_by_names_or_create(
             db,
-            catalog_product['id']
+            {result['retailer']: result['url'] for result, _ in found},
+            commit=False
+        )
+        
+        stores = {}
+        items = {}
+        for result, price in found:
+            store = store_by_retailer[result['retailer']]
+            stores[store['id']] = store
+            
+            # Misma tienda repetida: gana el último resultado (un upsert por fila)
+            items[store['id']] = {"store_id": store['id'], "url": result['url'], "price": price}
+        
+        saved = ProductService.upsert_scraped_products(
+            db, catalog_product['id'], list(items.values())
+        )
+        logger.debug("Guardados %d productos", len(saved))
+        
+        # Los productos desactivados no se listan, igual que en get_products_by_catalog_id
+        new_products = [
+            {
+                **product,
+                "store_name": stores[product['store_id']]['name'],
+                "store_active": stores[product['store_id']].get('active', True),
+            }
+            for product in saved
+            if product['active']
+        ]
+        
+        # Mismo orden que get_products_by_catalog_id: tiendas activas primero, menor precio
+        existing_products = sorted(
+            new_products,
+            key=lambda prod: (not prod['store_active'], prod['price']['price'])
         )
         
         was_scraped = True
     else:
-        print(f"✅ Se encontraron {len(existing_products)} productos scrapeados")
+        logger.debug("Se encontraron %d productos scrapeados", len(existing_products))
     
     # 5. Formatear respuesta
     products_with_prices = []
@@ -209,105 +313,51 @@ async def search_product(
         was_scraped=was_scraped
     )
     
-    print(f"✅ Retornando {len(products_with_prices)} productos")
-    print(f"================================\n")
+    logger.debug("Retornando %d productos", len(products_with_prices))
     
     return result
 
 
+async def _stream_products(query, ndjson: bool):
+    """
+    Emite los productos por particiones de un server-side cursor, sin
+    materializar el resultado completo. Abre su propia sesión porque el
+    cuerpo se genera después de que el endpoint retorna.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=PRODUCTS_STREAM_YIELD_PER))
+        separator = b"\n" if ndjson else b","
+        first = True
+        if not ndjson:
+            yield b"["
+        async for partition in result.partitions():
+            # Validación en bloque con pydantic-core; nest_price_columns arma el precio anidado
+            chunk = separator.join(
+                ProductWithPrice.model_validate(dict(row._mapping)).model_dump_json().encode()
+                for row in partition
+            )
+            if ndjson:
+                yield chunk + separator
+            else:
+                yield chunk if first else separator + chunk
+            first = False
+        if not ndjson:
+            yield b"]"
+
+
 @router.get("/products", response_model=list[ProductWithPrice])
-async def get_all_products(db: Session = Depends(get_db)):
+async def get_all_products(request: Request):
     """
     Obtiene todos los productos scrapeados con sus precios y detalles
     
+    La respuesta se streamea: por defecto como arreglo JSON, o como NDJSON
+    (un producto por línea) si el cliente envía Accept: application/x-ndjson.
+    
     Returns:
         Lista de productos con precios, tienda, catálogo, marca y categoría
     """
-    query = text("""
-        SELECT 
-            p.id,
-            p.catalog_id,
-            p.store_id,
-            p.url,
-            p.current_price,
-            p.active,
-            p.created_at,
-            p.updated_at,
-            p.last_scraped_at,
-            p.category_id,
-            -- Store info
-            s.name as store_name,
-            s.active as store_active,
-            -- Catalog info
-            pc.name as catalog_name,
-            pc.sku as catalog_sku,
-            -- Brand info
-            b.name as brand_name,
-            -- Category info
-            c.name as category_name,
-            -- Price info
-            pr.id as price_id,
-            pr.price,
-            pr.original_price,
-            pr.discount_percentage,
-            pr.currency,
-            pr.in_stock,
-            pr.created_at as price_created_at,
-            pr.updated_at as price_updated_at
-        FROM products p
-        LEFT JOIN stores s ON p.store_id = s.id
-        LEFT JOIN products_catalog pc ON p.catalog_id = pc.id
-        LEFT JOIN brands b ON pc.brand_id = b.id
-        LEFT JOIN categories c ON p.category_id = c.id
-        LEFT JOIN prices pr ON pr.product_id = p.id
-        WHERE p.active = true
-        ORDER BY 
-            pc.name,
-            s.active DESC,
-            pr.price ASC NULLS LAST
-    """)
-    
-    results = db.execute(query).fetchall()
-    
-    products = []
-    for row in results:
-        product = ProductWithPrice(
-            id=row.id,
-            catalog_id=row.catalog_id,
-            store_id=row.store_id,
-            category_id=row.category_id,
-            url=row.url,
-            current_price=row.current_price,
-            active=row.active,
-            created_at=row.created_at,
-            updated_at=row.updated_at,
-            last_scraped_at=row.last_scraped_at,
-            store_name=row.store_name,
-            catalog_name=row.catalog_name,
-            price=None
-        )
-        
-        # Add price if exists
-        if row.price_id:
-            from app.schemas.product import PriceResponse
-            product.price = PriceResponse(
-                id=row.price_id,
-                product_id=row.id,
-                price=row.price,
-                original_price=row.original_price,
-                discount_percentage=row.discount_percentage,
-                currency=row.currency,
-                in_stock=row.in_stock,
-                created_at=row.price_created_at,
-                updated_at=row.price_updated_at
-            )
-        
-        # Add extra info for display
-        product.store_active = row.store_active
-        product.catalog_sku = row.catalog_sku
-        product.brand_name = row.brand_name
-        product.category_name = row.category_name
-        
-        products.append(product)
-    
-    return products
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    return StreamingResponse(
+        _stream_products(_ALL_PRODUCTS_QUERY, ndjson),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json"
+    )
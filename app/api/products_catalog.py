@@ -1,12 +1,20 @@
 """
 Products Catalog API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, bindparam, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from uuid import UUID
+from functools import lru_cache
 
-from app.core.database import get_db
+from app.core.database import get_async_db, list_load_options
+from app.core.errors import raise_integrity_error
+from app.core.pagination import paginate, set_next_cursor
+from app.services.product_service import ProductService
 from app.models.product_catalog import ProductCatalog
 from app.models.brand import Brand
 from app.models.category import Category
@@ -19,60 +27,116 @@ from app.schemas.product_catalog import (
 
 router = APIRouter()
 
+# Serialización de listas en un solo paso con pydantic-core (sin el pipeline de response_model)
+_PRODUCT_LIST = TypeAdapter(List[ProductCatalogResponse])
+_PRODUCT_DETAILS_LIST = TypeAdapter(List[ProductCatalogWithDetails])
+
+
+@lru_cache(maxsize=16)
+def _products_stmt(active_only: bool, has_search: bool, has_brand: bool, has_category: bool):
+    """
+    SELECT de get_products por combinación de filtros (2^4 formas). Los valores
+    van como bindparams, así cada forma se construye una sola vez y comparte el
+    SQL compilado (y el plan preparado del lado de Postgres) entre requests.
+    """
+    query = select(ProductCatalog).options(*list_load_options())
+    
+    if active_only:
+        query = query.where(ProductCatalog.active == True)
+    
+    if has_search:
+        query = query.where(or_(
+            ProductCatalog.name.ilike(bindparam("search")),
+            ProductCatalog.sku.ilike(bindparam("search"))
+        ))
+    
+    if has_brand:
+        query = query.where(ProductCatalog.brand_id == bindparam("brand_id"))
+    
+    if has_category:
+        query = query.where(ProductCatalog.category_id == bindparam("category_id"))
+    
+    return query
+
+
+def _product_constraint_errors(product) -> dict:
+    """Mensajes de error por constraint para create/update de productos"""
+    return {
+        "sku": (
+            status.HTTP_400_BAD_REQUEST,
+            f"Product with SKU '{product.sku}' already exists"
+        ),
+        "name": (
+            status.HTTP_400_BAD_REQUEST,
+            f"Product with name '{product.name}' already exists"
+        ),
+        "brand_id": (
+            status.HTTP_404_NOT_FOUND,
+            f"Brand with id {product.brand_id} not found"
+        ),
+        "category_id": (
+            status.HTTP_404_NOT_FOUND,
+            f"Category with id {product.category_id} not found"
+        ),
+    }
+
 
 @router.get("/products-catalog", response_model=List[ProductCatalogResponse])
-def get_products(
-    skip: int = 0,
+async def get_products(
+    skip: int = Query(0, deprecated=True, description="Deprecated: use cursor"),
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     active_only: bool = False,
     search: Optional[str] = Query(None, description="Search by product name or SKU"),
     brand_id: Optional[UUID] = Query(None, description="Filter by brand"),
     category_id: Optional[UUID] = Query(None, description="Filter by category"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all products with optional filters
     """
-    query = db.query(ProductCatalog)
-    
-    if active_only:
-        query = query.filter(ProductCatalog.active == True)
-    
+    query = _products_stmt(active_only, bool(search), bool(brand_id), bool(category_id))
+    params = {}
     if search:
-        query = query.filter(
-            (ProductCatalog.name.ilike(f"%{search}%")) |
-            (ProductCatalog.sku.ilike(f"%{search}%"))
-        )
-    
+        params["search"] = f"%{search}%"
     if brand_id:
-        query = query.filter(ProductCatalog.brand_id == brand_id)
-    
+        params["brand_id"] = brand_id
     if category_id:
-        query = query.filter(ProductCatalog.category_id == category_id)
+        params["category_id"] = category_id
     
-    products = query.offset(skip).limit(limit).all()
-    return products
+    query = paginate(query, ProductCatalog, cursor, skip)
+    result = await db.execute(query.limit(limit), params)
+    products = result.scalars().all()
+    response = Response(
+        content=_PRODUCT_LIST.dump_json(_PRODUCT_LIST.validate_python(products, from_attributes=True)),
+        media_type="application/json"
+    )
+    set_next_cursor(response, products, limit)
+    return response
 
 
 @router.get("/products-catalog/with-details", response_model=List[ProductCatalogWithDetails])
-def get_products_with_details(
+async def get_products_with_details(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all products with brand and category information
     """
-    query = db.query(ProductCatalog).options(
-        joinedload(ProductCatalog.brand),
-        joinedload(ProductCatalog.category)
-    )
+    # selectinload: 1 query + 1 IN() por relación, sin duplicar filas del JOIN;
+    # list_load_options agrega raiseload('*') con SQLA_RAISELOAD: cualquier lazy
+    # load accidental en el loop falla
+    query = select(ProductCatalog).options(*list_load_options(
+        selectinload(ProductCatalog.brand),
+        selectinload(ProductCatalog.category),
+    ))
     
     if active_only:
-        query = query.filter(ProductCatalog.active == True)
+        query = query.where(ProductCatalog.active == True)
     
-    products = query.offset(skip).limit(limit).all()
+    products = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
     
     # Transform to include brand and category names
     result = []
@@ -93,18 +157,21 @@ def get_products_with_details(
         }
         result.append(product_dict)
     
-    return result
+    return Response(
+        content=_PRODUCT_DETAILS_LIST.dump_json(_PRODUCT_DETAILS_LIST.validate_python(result)),
+        media_type="application/json"
+    )
 
 
 @router.get("/products-catalog/{product_id}", response_model=ProductCatalogResponse)
-def get_product(
+async def get_product(
     product_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific product by ID
     """
-    product = db.query(ProductCatalog).filter(ProductCatalog.id == product_id).first()
+    product = (await db.execute(select(ProductCatalog).where(ProductCatalog.id == product_id))).scalar_one_or_none()
     
     if not product:
         raise HTTPException(
@@ -116,59 +183,37 @@ def get_product(
 
 
 @router.post("/products-catalog", response_model=ProductCatalogResponse, status_code=status.HTTP_201_CREATED)
-def create_product(
+async def create_product(
     product: ProductCatalogCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new product
     """
-    # Check if SKU already exists (if provided)
-    if product.sku:
-        existing = db.query(ProductCatalog).filter(ProductCatalog.sku == product.sku).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Product with SKU '{product.sku}' already exists"
-            )
-    
-    # If brand_id is provided, verify it exists
-    if product.brand_id:
-        brand = db.query(Brand).filter(Brand.id == product.brand_id).first()
-        if not brand:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Brand with id {product.brand_id} not found"
-            )
-    
-    # If category_id is provided, verify it exists
-    if product.category_id:
-        category = db.query(Category).filter(Category.id == product.category_id).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Category with id {product.category_id} not found"
-            )
-    
-    # Create new product
+    # Create new product (SKU duplicado / brand o category inexistentes los detecta la BD)
     db_product = ProductCatalog(**product.model_dump())
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _product_constraint_errors(product))
+    ProductService.invalidate_catalog_cache()
+    await db.refresh(db_product)
     
     return db_product
 
 
 @router.put("/products-catalog/{product_id}", response_model=ProductCatalogResponse)
-def update_product(
+async def update_product(
     product_id: UUID,
     product: ProductCatalogUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a product
     """
-    db_product = db.query(ProductCatalog).filter(ProductCatalog.id == product_id).first()
+    db_product = (await db.execute(select(ProductCatalog).where(ProductCatalog.id == product_id))).scalar_one_or_none()
     
     if not db_product:
         raise HTTPException(
@@ -176,53 +221,31 @@ def update_product(
             detail=f"Product with id {product_id} not found"
         )
     
-    # Check if new SKU conflicts with existing product
-    if product.sku and product.sku != db_product.sku:
-        existing = db.query(ProductCatalog).filter(ProductCatalog.sku == product.sku).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Product with SKU '{product.sku}' already exists"
-            )
-    
-    # If brand_id is being updated, verify it exists
-    if product.brand_id is not None:
-        brand = db.query(Brand).filter(Brand.id == product.brand_id).first()
-        if not brand:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Brand with id {product.brand_id} not found"
-            )
-    
-    # If category_id is being updated, verify it exists
-    if product.category_id is not None:
-        category = db.query(Category).filter(Category.id == product.category_id).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Category with id {product.category_id} not found"
-            )
-    
-    # Update fields
+    # Update fields (SKU duplicado / brand o category inexistentes los detecta la BD)
     update_data = product.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_product, field, value)
     
-    db.commit()
-    db.refresh(db_product)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_integrity_error(e, _product_constraint_errors(product))
+    ProductService.invalidate_catalog_cache()
+    await db.refresh(db_product)
     
     return db_product
 
 
 @router.delete("/products-catalog/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a product
     """
-    db_product = db.query(ProductCatalog).filter(ProductCatalog.id == product_id).first()
+    db_product = (await db.execute(select(ProductCatalog).where(ProductCatalog.id == product_id))).scalar_one_or_none()
     
     if not db_product:
         raise HTTPException(
@@ -232,7 +255,8 @@ def delete_product(
     
     # TODO: Add check for associated store products when products table is implemented
     
-    db.delete(db_product)
-    db.commit()
+    await db.delete(db_product)
+    await db.commit()
+    ProductService.invalidate_catalog_cache()
     
     return None
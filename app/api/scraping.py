@@ -2,11 +2,28 @@
 Endpoints para scraping usando Google Shopping
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 from typing import List
+import asyncio
+import logging
+
+from app.core.breaker import CircuitOpenError
+from app.core.cache import SCRAPE_CACHE_TTL, SCRAPE_NEGATIVE_CACHE_TTL, cache_get, cache_set, scrape_cache_key
+from app.core.rate_limit import run_browser_scrape
+from app.core.singleflight import SingleFlight
+import app.core.scraper_path  # noqa: F401 - agrega simplify-scraper al sys.path
+
+try:
+    from scrapers.google_shopping import scrape_google_shopping
+except ImportError:  # simplify-scraper no instalado junto a la API
+    scrape_google_shopping = None
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Coalescing de scrapings idénticos en curso (clave = clave de cache)
+scrape_flight = SingleFlight()
 
 
 class ScrapeRequest(BaseModel):
@@ -24,11 +41,60 @@ class RetailerResult(BaseModel):
     encontrado: bool
 
 
+_RETAILER_FIELDS = frozenset(RetailerResult.model_fields)
+
+
 class MultiScrapeResponse(BaseModel):
     """Response del scraping multi-retailer"""
     results: List[RetailerResult]
 
 
+async def _scrape_and_cache(product_name: str, cache_key: str) -> MultiScrapeResponse:
+    """
+    Ejecuta el scraper de Google Shopping y guarda el resultado en cache
+    """
+    if scrape_google_shopping is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google Shopping scraper is not available"
+        )
+    
+    # Ejecutar el scraping (límite global de navegadores + timeout)
+    try:
+        results = await run_browser_scrape("google_shopping", scrape_google_shopping, product_name)
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google Shopping scraping is temporarily unavailable"
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Google Shopping scraping timed out for '{product_name}'"
+        )
+    
+    # Convertir a RetailerResult sin revalidar: el scraper ya entrega los
+    # campos con su tipo; solo se valida si a un dict le falta algún campo
+    final_results = [
+        RetailerResult.model_construct(**result) if _RETAILER_FIELDS <= result.keys()
+        else RetailerResult(**result)
+        for result in results
+    ]
+    
+    logger.info("Google Shopping '%s': %d vendedores", product_name, len(final_results))
+    for result in final_results:
+        logger.debug("  %s: %s", result.retailer, result.precio)
+    
+    response = MultiScrapeResponse(results=final_results)
+    found_any = any(result.encontrado for result in final_results)
+    await cache_set(
+        cache_key,
+        response.model_dump_json(),
+        SCRAPE_CACHE_TTL if found_any else SCRAPE_NEGATIVE_CACHE_TTL
+    )
+    return response
+
+
 @router.post("/scrape/google-shopping", response_model=MultiScrapeResponse)
 async def scrape_google_shopping_endpoint(request: ScrapeRequest):
     """
@@ -38,30 +104,17 @@ async def scrape_google_shopping_endpoint(request: ScrapeRequest):
     VENTAJA: Más rápido y preciso que scrapear cada sitio individualmente.
     Puede obtener hasta 20 vendedores en una sola consulta.
     """
-    import sys
-    import os
-    
-    print(f"\n=== INICIANDO SCRAPING GOOGLE SHOPPING ===")
-    print(f"Producto: {request.product_name}")
-    
-    # Agregar el path del scraper al PYTHONPATH
-    scraper_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../simplify-scraper'))
-    if scraper_path not in sys.path:
-        sys.path.append(scraper_path)
+    logger.info("Scraping Google Shopping: %s", request.product_name)
     
-    # Importar el scraper de Google Shopping
-    from scrapers.google_shopping import scrape_google_shopping
-    
-    # Ejecutar el scraping
-    results = await scrape_google_shopping(request.product_name)
-    
-    # Convertir a RetailerResult
-    final_results = [RetailerResult(**result) for result in results]
-    
-    print(f"\n=== RESULTADO GOOGLE SHOPPING ===")
-    print(f"Total de vendedores: {len(final_results)}")
-    for result in final_results:
-        print(f"  {result.retailer}: {result.precio}")
-    print(f"================================\n")
+    # Read-through: búsquedas repetidas del mismo producto no vuelven a scrapear
+    cache_key = scrape_cache_key("google-shopping", request.product_name)
+    cached = await cache_get(cache_key)
+    if cached:
+        logger.debug("Resultado desde cache: %s", request.product_name)
+        return MultiScrapeResponse.model_validate_json(cached)
     
-    return MultiScrapeResponse(results=final_results)
+    # Requests concurrentes por el mismo producto comparten un único scraping
+    return await scrape_flight.do(
+        cache_key,
+        lambda: _scrape_and_cache(request.product_name, cache_key)
+    )
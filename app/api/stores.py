@@ -1,50 +1,99 @@
 """
 Stores API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import TypeAdapter
 from typing import List, Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.cache import cache_bump_generation, cache_generation, cache_get, cache_invalidate, cache_set_indexed
+from app.core.database import get_async_db, list_load_options
+from app.core.pagination import NEXT_CURSOR_HEADER, paginate, set_next_cursor
 from app.models.store import Store
-from app.schemas.store import StoreCreate, StoreUpdate, StoreResponse
+from app.services.product_service import ProductService
+from app.schemas.store import StoreCreate, StoreUpdate, StoreResponse, StoreBulkResult
 
 router = APIRouter()
 
+# Cache en Redis del listado: compartido entre workers, se invalida en cada
+# escritura. Las tiendas que crea el scraping (inactivas) aparecen al vencer el TTL.
+STORES_CACHE_TTL = 60
+STORES_CACHE_INDEX = "stores:v2:keys"
+# Generación del listado: va en la clave, así una lectura que empezó antes de
+# una escritura no puede volver a poblar la entrada vigente con datos viejos
+STORES_CACHE_GENERATION = "stores:v2:gen"
+
+# Máximo de tiendas por POST /stores/bulk (un solo INSERT multi-VALUES)
+STORES_BULK_MAX = 1000
+
+_STORE_LIST = TypeAdapter(List[StoreResponse])
+
+
+async def _invalidate_store_caches() -> None:
+    """Listado en Redis + lookup por nombre en proceso (ProductService)"""
+    await cache_bump_generation(STORES_CACHE_GENERATION)
+    await cache_invalidate(STORES_CACHE_INDEX)
+    ProductService.invalidate_store_cache()
+
 
 @router.get("/stores", response_model=List[StoreResponse])
-def get_stores(
-    skip: int = 0,
+async def get_stores(
+    skip: int = Query(0, deprecated=True, description="Deprecated: use cursor"),
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     active_only: bool = False,
     search: Optional[str] = Query(None, description="Search by store name"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all stores with optional filters
     """
-    query = db.query(Store)
+    # Generación leída antes de consultar la BD; sin Redis no se usa cache
+    generation = await cache_generation(STORES_CACHE_GENERATION)
+    cache_key = f"stores:v2:{generation}:{skip}:{limit}:{cursor or ''}:{active_only}:{search or ''}"
+    cached = await cache_get(cache_key) if generation is not None else None
+    if cached:
+        # Valor cacheado: "<next cursor>\n<json>" (cursor vacío si es la última página)
+        next_cursor, content = cached.split(b"\n", 1)
+        response = Response(content=content, media_type="application/json")
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor.decode()
+        return response
+    
+    query = select(Store).options(*list_load_options())
     
     if active_only:
-        query = query.filter(Store.active == True)
+        query = query.where(Store.active == True)
     
     if search:
-        query = query.filter(Store.name.ilike(f"%{search}%"))
-    
-    stores = query.offset(skip).limit(limit).all()
-    return stores
+        query = query.where(Store.name.ilike(f"%{search}%"))
+    
+    query = paginate(query, Store, cursor, skip)
+    result = await db.execute(query.limit(limit))
+    stores = result.scalars().all()
+    response = Response(
+        content=_STORE_LIST.dump_json(_STORE_LIST.validate_python(stores, from_attributes=True)),
+        media_type="application/json"
+    )
+    set_next_cursor(response, stores, limit)
+    next_cursor = response.headers.get(NEXT_CURSOR_HEADER, "").encode()
+    if generation is not None:
+        await cache_set_indexed(STORES_CACHE_INDEX, cache_key, next_cursor + b"\n" + response.body, STORES_CACHE_TTL)
+    return response
 
 
 @router.get("/stores/{store_id}", response_model=StoreResponse)
-def get_store(
+async def get_store(
     store_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific store by ID
     """
-    store = db.query(Store).filter(Store.id == store_id).first()
+    store = (await db.execute(select(Store).where(Store.id == store_id))).scalar_one_or_none()
     
     if not store:
         raise HTTPException(
@@ -56,16 +105,16 @@ def get_store(
 
 
 @router.post("/stores", response_model=StoreResponse, status_code=status.HTTP_201_CREATED)
-def create_store(
+async def create_store(
     store: StoreCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new store
     """
     # Check if name already exists
-    existing = db.query(Store).filter(Store.name == store.name).first()
-    if existing:
+    name_taken = (await db.execute(select(exists().where(Store.name == store.name)))).scalar()
+    if name_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Store with name '{store.name}' already exists"
@@ -74,22 +123,57 @@ def create_store(
     # Create new store
     db_store = Store(**store.model_dump())
     db.add(db_store)
-    db.commit()
-    db.refresh(db_store)
+    await db.commit()
+    await _invalidate_store_caches()
+    await db.refresh(db_store)
     
     return db_store
 
 
+@router.post("/stores/bulk", response_model=StoreBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_stores_bulk(
+    stores: List[StoreCreate] = Body(..., min_length=1, max_length=STORES_BULK_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create many stores in one statement and one transaction.
+    Names that already exist are skipped (ON CONFLICT DO NOTHING).
+    """
+    # Nombres repetidos en el mismo request: gana el primero
+    rows = {}
+    for store in stores:
+        rows.setdefault(store.name, store.model_dump())
+    rows = list(rows.values())
+    
+    result = await db.execute(
+        pg_insert(Store)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[Store.name])
+        .returning(Store)
+    )
+    created = result.scalars().all()
+    await db.commit()
+    
+    if created:
+        await _invalidate_store_caches()
+    
+    created_names = {store.name for store in created}
+    return StoreBulkResult(
+        created=created,
+        skipped=[row["name"] for row in rows if row["name"] not in created_names]
+    )
+
+
 @router.put("/stores/{store_id}", response_model=StoreResponse)
-def update_store(
+async def update_store(
     store_id: UUID,
     store: StoreUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a store
     """
-    db_store = db.query(Store).filter(Store.id == store_id).first()
+    db_store = (await db.execute(select(Store).where(Store.id == store_id))).scalar_one_or_none()
     
     if not db_store:
         raise HTTPException(
@@ -99,8 +183,8 @@ def update_store(
     
     # Check if new name conflicts with existing store
     if store.name and store.name != db_store.name:
-        existing = db.query(Store).filter(Store.name == store.name).first()
-        if existing:
+        name_taken = (await db.execute(select(exists().where(Store.name == store.name)))).scalar()
+        if name_taken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Store with name '{store.name}' already exists"
@@ -111,21 +195,22 @@ def update_store(
     for field, value in update_data.items():
         setattr(db_store, field, value)
     
-    db.commit()
-    db.refresh(db_store)
+    await db.commit()
+    await _invalidate_store_caches()
+    await db.refresh(db_store)
     
     return db_store
 
 
 @router.delete("/stores/{store_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_store(
+async def delete_store(
     store_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a store
     """
-    db_store = db.query(Store).filter(Store.id == store_id).first()
+    db_store = (await db.execute(select(Store).where(Store.id == store_id))).scalar_one_or_none()
     
     if not db_store:
         raise HTTPException(
@@ -135,7 +220,8 @@ def delete_store(
     
     # TODO: Add check for associated products when products table is implemented
     
-    db.delete(db_store)
-    db.commit()
+    await db.delete(db_store)
+    await db.commit()
+    await _invalidate_store_caches()
     
     return None
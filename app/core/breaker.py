@@ -0,0 +1,110 @@
+"""
+Circuit breaker per scraping backend
+"""
+import os
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class CircuitOpenError(Exception):
+    """El circuito del backend está abierto: la llamada se rechaza sin ejecutarse."""
+
+    def __init__(self, backend: str):
+        super().__init__(f"Circuit open for scraping backend '{backend}'")
+        self.backend = backend
+
+
+class CircuitBreaker:
+    """
+    CLOSED: deja pasar todo y cuenta fallas en una ventana móvil; con
+    failure_threshold fallas dentro de window_seconds pasa a OPEN.
+    OPEN: rechaza de inmediato durante cooldown_seconds, luego HALF_OPEN.
+    HALF_OPEN: deja pasar una sola llamada de prueba; si funciona vuelve a
+    CLOSED, si falla vuelve a OPEN.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, window_seconds: float = 60, cooldown_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.rejected_count = 0
+        self._failures: Deque[float] = deque()
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """True si la llamada puede ejecutarse (en HALF_OPEN, solo la prueba)."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                self.rejected_count += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected_count += 1
+                return False
+            self._probe_in_flight = True
+
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures.clear()
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._open(now)
+            return
+
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window_seconds:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._open(now)
+
+    def release_probe(self) -> None:
+        """La llamada se canceló sin resultado: libera el turno de prueba."""
+        self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        self._failures.clear()
+        self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_failures": len(self._failures),
+            "rejected_count": self.rejected_count,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(backend: str) -> CircuitBreaker:
+    """Breaker del backend (se crea en el primer uso, configurado por env)."""
+    breaker = _breakers.get(backend)
+    if breaker is None:
+        breaker = _breakers[backend] = CircuitBreaker(
+            failure_threshold=int(os.getenv("SCRAPE_BREAKER_THRESHOLD", "5")),
+            window_seconds=float(os.getenv("SCRAPE_BREAKER_WINDOW_SECONDS", "60")),
+            cooldown_seconds=float(os.getenv("SCRAPE_BREAKER_COOLDOWN_SECONDS", "30")),
+        )
+    return breaker
+
+
+def breaker_snapshots() -> Dict[str, dict]:
+    """Estado de todos los breakers, para /metrics."""
+    return {backend: breaker.snapshot() for backend, breaker in _breakers.items()}
@@ -0,0 +1,124 @@
+"""
+Redis cache (read-through) para resultados de scraping y listados de la API
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import unicodedata
+from typing import Optional
+
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# TTL de resultados de scraping (segundos); se aplica con ±10% de jitter para
+# que claves cacheadas juntas no expiren todas a la vez
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "600"))
+SCRAPE_CACHE_TTL_JITTER = 0.1
+
+# Resultados sin ningún vendedor encontrado: TTL corto, para frenar búsquedas
+# repetidas de nombres inexistentes sin ocultar por mucho un producto nuevo
+SCRAPE_NEGATIVE_CACHE_TTL = int(os.getenv("SCRAPE_NEGATIVE_CACHE_TTL", "60"))
+
+# Tiempo máximo por operación: si Redis no responde, se sigue sin cache
+REDIS_TIMEOUT_SECONDS = 0.05
+
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_product_name(product_name: str) -> str:
+    """Minúsculas, sin acentos y con espacios colapsados."""
+    decomposed = unicodedata.normalize("NFKD", product_name.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE_RE.sub(" ", stripped).strip()
+
+
+def scrape_cache_key(endpoint: str, product_name: str) -> str:
+    """Clave de cache: scrape:v1:{endpoint}:{sha1(nombre normalizado)}"""
+    digest = hashlib.sha1(normalize_product_name(product_name).encode()).hexdigest()
+    return f"scrape:v1:{endpoint}:{digest}"
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """Retorna el valor cacheado o None (también si Redis no está disponible)."""
+    try:
+        return await asyncio.wait_for(redis_client.get(key), REDIS_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.debug("Redis no disponible (get %s): %r", key, e)
+        return None
+
+
+def _jittered(ttl: int) -> int:
+    jitter = int(ttl * SCRAPE_CACHE_TTL_JITTER)
+    return ttl + random.randint(-jitter, jitter)
+
+
+async def cache_set(key: str, value: bytes, ttl: int = SCRAPE_CACHE_TTL) -> None:
+    """Guarda el valor con TTL con jitter; los errores de Redis se ignoran."""
+    try:
+        await asyncio.wait_for(
+            redis_client.set(key, value, ex=_jittered(ttl)),
+            REDIS_TIMEOUT_SECONDS
+        )
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.debug("Redis no disponible (set %s): %r", key, e)
+
+
+async def cache_set_indexed(index_key: str, key: str, value: bytes, ttl: int) -> None:
+    """
+    Como cache_set, pero además registra key en el set index_key para poder
+    invalidar todo el grupo con cache_invalidate (sin recorrer con KEYS).
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(key, value, ex=_jittered(ttl))
+        pipe.sadd(index_key, key)
+        pipe.expire(index_key, ttl * 2)
+        await asyncio.wait_for(pipe.execute(), REDIS_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.debug("Redis no disponible (set %s): %r", key, e)
+
+
+async def cache_invalidate(index_key: str) -> None:
+    """
+    Borra todas las claves registradas en index_key. Si Redis no responde,
+    las entradas expiran solas por TTL.
+    """
+    try:
+        keys = await asyncio.wait_for(redis_client.smembers(index_key), REDIS_TIMEOUT_SECONDS)
+        await asyncio.wait_for(redis_client.delete(index_key, *keys), REDIS_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.warning("No se pudo invalidar el cache %s: %r", index_key, e)
+
+
+async def cache_generation(generation_key: str) -> Optional[int]:
+    """
+    Generación vigente de un grupo de claves (0 si nunca se invalidó), o None
+    si Redis no está disponible. Los lectores la incluyen en sus claves: una
+    lectura que empezó antes de una escritura guarda su resultado bajo la
+    generación vieja, que ya nadie consulta.
+    """
+    try:
+        value = await asyncio.wait_for(redis_client.get(generation_key), REDIS_TIMEOUT_SECONDS)
+        return int(value or 0)
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.debug("Redis no disponible (get %s): %r", generation_key, e)
+        return None
+
+
+async def cache_bump_generation(generation_key: str) -> None:
+    """Avanza la generación: las claves de la anterior dejan de leerse."""
+    try:
+        await asyncio.wait_for(redis_client.incr(generation_key), REDIS_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+        logger.warning("No se pudo invalidar el cache %s: %r", generation_key, e)
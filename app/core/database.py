@@ -3,8 +3,9 @@ Database configuration
 """
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, raiseload
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,16 +20,47 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
+# Pool de conexiones (aplica a cada engine, sync y async, por proceso)
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+    "pool_pre_ping": True,    # descarta conexiones cortadas antes de usarlas
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+}
+
+# Log de cada sentencia SQL: solo para depurar en local (bloquea en stdout)
+DB_ECHO = os.getenv("DB_ECHO", "False").lower() == "true"
+
 # Create engine
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, echo=DB_ECHO, **POOL_OPTIONS)
 
 # Session local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine - psycopg3 soporta asyncio con la misma URL postgresql+psycopg://
+async_engine = create_async_engine(DATABASE_URL, echo=DB_ECHO, **POOL_OPTIONS)
+
+# Async session local
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Guardia anti N+1 (dev/staging): los list endpoints agregan raiseload('*') y
+# cualquier lazy load no declarado falla en vez de ejecutar una query por fila
+SQLA_RAISELOAD = os.getenv("SQLA_RAISELOAD", "False").lower() == "true"
+
 # Base class for models
 Base = declarative_base()
 
 
+def list_load_options(*options):
+    """
+    Opciones de carga para list endpoints: las relaciones explícitas que usa el
+    response model, más raiseload('*') si SQLA_RAISELOAD está activo
+    """
+    if SQLA_RAISELOAD:
+        return (*options, raiseload('*'))
+    return options
+
+
 # Dependency
 def get_db():
     """
@@ -39,3 +71,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency to get async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
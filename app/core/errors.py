@@ -0,0 +1,23 @@
+"""
+Database error translation
+"""
+from typing import Dict, NoReturn, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+
+def raise_integrity_error(error: IntegrityError, constraint_errors: Dict[str, Tuple[int, str]]) -> NoReturn:
+    """
+    Traduce un IntegrityError (UNIQUE / FOREIGN KEY) a HTTPException.
+
+    constraint_errors mapea un fragmento del nombre del constraint (ej: "slug",
+    "parent_id") a (status_code, detail); se usa el primero que aparezca en el
+    nombre reportado por PostgreSQL. Si ninguno coincide, se relanza el error.
+    """
+    diag = getattr(error.orig, "diag", None)
+    constraint_name = getattr(diag, "constraint_name", None) or ""
+    for fragment, (status_code, detail) in constraint_errors.items():
+        if fragment in constraint_name:
+            raise HTTPException(status_code=status_code, detail=detail) from error
+    raise error
@@ -0,0 +1,55 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Cursor opaco a partir de (created_at, id) del último elemento de la página."""
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decodifica un cursor a (created_at, id); 400 si el formato es inválido."""
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def paginate(query, model, cursor: Optional[str], skip: int = 0):
+    """
+    Ordena por (created_at DESC, id DESC) y, si hay cursor, filtra los elementos
+    posteriores a él. Funciona con Query (ORM) y con select().
+    
+    skip (deprecado) solo se aplica sin cursor: combinado con uno saltaría
+    filas entre páginas.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, id))
+    elif skip:
+        query = query.offset(skip)
+    return query
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Agrega el header X-Next-Cursor si la página vino completa."""
+    if items and len(items) == limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
@@ -0,0 +1,69 @@
+"""
+Rate limiting for outbound scraping
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.core.breaker import CircuitOpenError, get_breaker
+
+T = TypeVar("T")
+
+# Máximo de scrapings con navegador en paralelo por proceso: cada scraper de
+# simplify-scraper lanza su propio Chromium, así una ráfaga de requests no
+# levanta decenas de navegadores a la vez
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "5"))
+browser_scrape_semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+
+# Tiempo máximo de un scraping (sin contar la espera del semáforo): un retailer
+# colgado falla rápido en vez de depender de los timeouts internos del scraper
+SCRAPE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "20"))
+
+
+async def run_browser_scrape(backend: str, scraper: Callable[..., Awaitable[T]], *args: Any) -> T:
+    """
+    Ejecuta scraper(*args) dentro del límite global de navegadores y con
+    SCRAPE_TIMEOUT_SECONDS; lanza asyncio.TimeoutError si se excede.
+
+    Pasa por el circuit breaker de backend: si está abierto lanza
+    CircuitOpenError sin lanzar el navegador. Timeouts y excepciones del
+    scraper cuentan como fallas.
+    """
+    breaker = get_breaker(backend)
+    if not breaker.allow():
+        raise CircuitOpenError(backend)
+
+    try:
+        async with browser_scrape_semaphore:
+            result = await asyncio.wait_for(scraper(*args), SCRAPE_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        breaker.release_probe()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+class DomainRateLimiter:
+    """
+    Espacia las solicitudes consecutivas a un mismo dominio en al menos delay_ms.
+    Las solicitudes a dominios distintos no se bloquean entre sí.
+    """
+
+    def __init__(self, delay_ms: int):
+        self.delay = delay_ms / 1000
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._last_request: Dict[str, float] = {}
+
+    async def wait(self, domain: str) -> None:
+        """Espera hasta que se pueda hacer una nueva solicitud a domain."""
+        async with self._locks[domain]:
+            elapsed = time.monotonic() - self._last_request.get(domain, 0.0)
+            if elapsed < self.delay:
+                await asyncio.sleep(self.delay - elapsed)
+            self._last_request[domain] = time.monotonic()
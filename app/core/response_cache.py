@@ -0,0 +1,67 @@
+"""
+In-process response cache with ETag support
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+
+def make_etag(body: bytes) -> str:
+    """ETag fuerte a partir del contenido de la respuesta."""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    """
+    Retorna 304 si el cliente ya tiene esta versión (If-None-Match),
+    o el JSON serializado con su ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+class ResponseCache:
+    """
+    Cache LRU con TTL de respuestas JSON ya serializadas.
+
+    invalidate() vacía el cache y avanza la versión: un set() con la versión
+    leída antes de la invalidación se descarta, así una lectura concurrente
+    con una escritura no deja datos viejos en el cache.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 512):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes, str]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        """Retorna (body, etag) si la entrada existe y no expiró."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, body, etag = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body, etag
+
+    def set(self, key: Hashable, body: bytes, version: int) -> Tuple[bytes, str]:
+        """Guarda body (si version sigue vigente) y retorna (body, etag)."""
+        etag = make_etag(body)
+        if version == self.version:
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._entries.clear()
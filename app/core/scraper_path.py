@@ -0,0 +1,15 @@
+"""
+Scraper path configuration
+
+simplify-scraper vive como repositorio hermano de simplify-api; se agrega
+al sys.path una sola vez al importar este módulo.
+"""
+import os
+import sys
+
+SCRAPER_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../../simplify-scraper')
+)
+
+if SCRAPER_PATH not in sys.path:
+    sys.path.append(SCRAPER_PATH)
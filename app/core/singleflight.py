@@ -0,0 +1,37 @@
+"""
+Single-flight: coalesce concurrent identical calls into one execution
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Mientras una llamada con cierta clave está en curso, las siguientes con la
+    misma clave esperan su resultado (o su excepción) en vez de repetirla.
+
+    Solo coalesce dentro de un proceso; con varios workers cada uno puede
+    ejecutar su propia llamada.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            # La llamada corre en su propia task, no en la del primer request:
+            # si ese cliente se desconecta, los demás siguen recibiendo el resultado
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # shield: cancelar un request (incluido el primero) no cancela la llamada compartida
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marcar como leída si todos los que esperaban se cancelaron
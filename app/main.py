@@ -1,11 +1,62 @@
+import asyncio
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import scraping, categories, brands, manufacturers, stores, products_catalog, products
+from app.core.breaker import breaker_snapshots
+from app.core.cache import redis_client
+from app.core.database import engine, async_engine
+
+# Logging no bloqueante: los handlers del root solo encolan el registro y un
+# thread (QueueListener) hace la escritura a stderr fuera del event loop
+logging.basicConfig(level=logging.INFO)
+_log_queue: queue.Queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+log_listener.start()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: abre una conexión de Postgres y de Redis para que el primer
+    request no pague el handshake (los scrapers ya se importan al cargar los
+    routers). Si alguno no está disponible la API arranca igual.
+    Shutdown: cierra los pools y vacía la cola de logging.
+    """
+    try:
+        async with async_engine.connect():
+            pass
+    except Exception as e:
+        logger.warning("No se pudo precalentar el pool de Postgres: %r", e)
+    try:
+        await asyncio.wait_for(redis_client.ping(), 1)
+    except Exception as e:
+        logger.warning("No se pudo precalentar el pool de Redis: %r", e)
+
+    yield
+
+    await redis_client.aclose()
+    await async_engine.dispose()
+    engine.dispose()
+    log_listener.stop()
+
 
 app = FastAPI(
     title="Simplify API",
     description="API para extracción y análisis de datos de retail",
-    version="0.1.0"
+    version="0.1.0",
+    # orjson para los endpoints que retornan modelos/dicts (los listados ya
+    # retornan bytes serializados por pydantic)
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -15,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Incluir routers
@@ -45,3 +97,11 @@ async def health():
     Health check
     """
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Estado de los circuit breakers de scraping (por proceso)
+    """
+    return {"circuit_breakers": breaker_snapshots()}
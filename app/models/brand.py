@@ -1,11 +1,9 @@
 """
 Brand model
 """
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, TIMESTAMP, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
 from app.core.database import Base
 
@@ -14,14 +12,14 @@ class Brand(Base):
     """Brand model"""
     __tablename__ = "brands"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    manufacturer_id = Column(UUID(as_uuid=True), ForeignKey("manufacturers.id", ondelete="SET NULL"), nullable=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    manufacturer_id = Column(UUID(as_uuid=True), ForeignKey("manufacturers.id", ondelete="SET NULL"), nullable=True, index=True)
     name = Column(String(255), unique=True, nullable=False, index=True)
     logo_url = Column(String(500), nullable=True)
     product_count = Column(Integer, default=0)
     active = Column(Boolean, default=True)
-    created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     manufacturer = relationship("Manufacturer", back_populates="brands")
@@ -1,11 +1,10 @@
 """
 Category model
 """
-from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, TIMESTAMP, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import uuid
 
 from app.core.database import Base
 
@@ -16,13 +15,13 @@ class Category(Base):
     """
     __tablename__ = "categories"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String(255), nullable=False)
     slug = Column(String(255), unique=True, nullable=False)
     description = Column(Text, nullable=True)
     
     # Jerarquía
-    parent_id = Column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
+    parent_id = Column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="SET NULL"), nullable=True, index=True)
     
     # Estadísticas
     product_count = Column(Integer, default=0)
@@ -37,3 +36,8 @@ class Category(Base):
     # Relationships
     parent = relationship("Category", remote_side=[id], back_populates="children")
     children = relationship("Category", back_populates="parent")
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_categories_created_id", created_at.desc(), id.desc()),
+    )
@@ -1,11 +1,9 @@
 """
 Manufacturer model
 """
-from sqlalchemy import Column, String, Text, TIMESTAMP
+from sqlalchemy import Column, String, Text, TIMESTAMP, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
 from app.core.database import Base
 
@@ -14,15 +12,27 @@ class Manufacturer(Base):
     """Manufacturer model"""
     __tablename__ = "manufacturers"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String(255), unique=True, nullable=False, index=True)
     tax_id = Column(String(100), unique=True, nullable=True)
     country = Column(String(100), nullable=True)
     logo_url = Column(Text, nullable=True)
     website = Column(Text, nullable=True)
     main_business_line = Column(String(255), nullable=True)
-    created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     brands = relationship("Brand", back_populates="manufacturer")
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_manufacturers_created_id", created_at.desc(), id.desc()),
+        # Búsqueda por substring (pg_trgm): name ILIKE '%x%' usa este índice
+        Index(
+            "ix_manufacturers_name_trgm",
+            name,
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
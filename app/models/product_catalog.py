@@ -1,11 +1,9 @@
 """
 Product Catalog model
 """
-from sqlalchemy import Column, String, Boolean, TIMESTAMP, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, TIMESTAMP, ForeignKey, Text, Index, UniqueConstraint, func, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
 from app.core.database import Base
 
@@ -14,7 +12,7 @@ class ProductCatalog(Base):
     """Product Catalog model - Productos únicos"""
     __tablename__ = "products_catalog"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String(500), nullable=False)
     sku = Column(String(100), unique=True, nullable=True)
     brand_id = Column(UUID(as_uuid=True), ForeignKey("brands.id", ondelete="SET NULL"), nullable=True)
@@ -22,9 +20,44 @@ class ProductCatalog(Base):
     attributes = Column(JSONB, nullable=True)
     image_url = Column(String(500), nullable=True)
     active = Column(Boolean, default=True)
-    created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     brand = relationship("Brand")
     category = relationship("Category")
+
+    __table_args__ = (
+        # Búsqueda fuzzy / substring por nombre (pg_trgm): name % :q y
+        # name ILIKE '%x%' usan este índice
+        Index(
+            "ix_products_catalog_name_trgm",
+            name,
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # Búsqueda por substring de SKU (pg_trgm): sku ILIKE '%x%'
+        Index(
+            "ix_products_catalog_sku_trgm",
+            sku,
+            postgresql_using="gin",
+            postgresql_ops={"sku": "gin_trgm_ops"},
+        ),
+        # Deduplicación por nombre (INSERT ... ON CONFLICT (name) DO NOTHING)
+        UniqueConstraint("name", name="uq_products_catalog_name"),
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_products_catalog_created_id", created_at.desc(), id.desc()),
+        # Búsqueda por prefijo de nombre dentro de una marca: lower(name) LIKE 'x%'
+        Index(
+            "ix_products_catalog_brand_lower_name",
+            brand_id,
+            func.lower(name).label("lower_name"),
+            postgresql_ops={"lower_name": "text_pattern_ops"},
+        ),
+        # search_catalog_by_name: match exacto sin mayúsculas antes del fuzzy
+        Index(
+            "ix_products_catalog_active_lower_name",
+            func.lower(name).label("lower_name"),
+            postgresql_where=text("active = true"),
+        ),
+    )
@@ -1,10 +1,8 @@
 """
 Store model
 """
-from sqlalchemy import Column, String, Text, Boolean, TIMESTAMP
+from sqlalchemy import Column, String, Text, Boolean, TIMESTAMP, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
-import uuid
-from datetime import datetime
 
 from app.core.database import Base
 
@@ -13,9 +11,32 @@ class Store(Base):
     """Store model"""
     __tablename__ = "stores"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    name = Column(String(255), nullable=False)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    name = Column(String(255), unique=True, nullable=False, index=True)
     base_url = Column(Text, nullable=False)
     active = Column(Boolean, default=True)
-    created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_stores_created_id", created_at.desc(), id.desc()),
+        # Búsqueda por substring (pg_trgm): name ILIKE '%x%' usa este índice
+        Index(
+            "ix_stores_name_trgm",
+            name,
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # get_store_by_name: match exacto por lower(name) (B-tree) y, si no hay,
+        # el más cercano entre tiendas activas: GiST permite recorrer el índice
+        # en orden de lower(name) <-> :s (KNN) y cortar en LIMIT 1
+        Index("ix_stores_lower_name", func.lower(name).label("lower_name")),
+        Index(
+            "ix_stores_active_lower_name_trgm_gist",
+            func.lower(name).label("lower_name"),
+            postgresql_using="gist",
+            postgresql_ops={"lower_name": "gist_trgm_ops"},
+            postgresql_where=(active == True),
+        ),
+    )
@@ -1,7 +1,7 @@
 """
 Brand schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
@@ -41,10 +41,28 @@ class BrandResponse(BrandBase):
         from_attributes = True
 
 
+class BrandManufacturerInfo(BaseModel):
+    """Manufacturer fields embedded in brand responses"""
+    name: str
+    country: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class BrandWithManufacturer(BrandResponse):
     """Schema for brand with manufacturer details"""
-    manufacturer_name: Optional[str] = None
-    manufacturer_country: Optional[str] = None
+    manufacturer: Optional[BrandManufacturerInfo] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def manufacturer_name(self) -> Optional[str]:
+        return self.manufacturer.name if self.manufacturer else None
+
+    @computed_field
+    @property
+    def manufacturer_country(self) -> Optional[str]:
+        return self.manufacturer.country if self.manufacturer else None
 
     class Config:
         from_attributes = True
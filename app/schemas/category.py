@@ -7,6 +7,9 @@ from datetime import datetime
 from uuid import UUID
 import re
 
+_SLUG_STRIP_RE = re.compile(r'[^\w\s-]')
+_SLUG_DASH_RE = re.compile(r'[-\s]+')
+
 
 class CategoryBase(BaseModel):
     """Base category schema"""
@@ -30,8 +33,8 @@ class CategoryCreate(BaseModel):
         if not self.slug:
             # Convert to lowercase and replace spaces/special chars with hyphens
             slug = self.name.lower()
-            slug = re.sub(r'[^\w\s-]', '', slug)  # Remove special chars
-            slug = re.sub(r'[-\s]+', '-', slug)    # Replace spaces with hyphens
+            slug = _SLUG_STRIP_RE.sub('', slug)  # Remove special chars
+            slug = _SLUG_DASH_RE.sub('-', slug)  # Replace spaces with hyphens
             slug = slug.strip('-')                  # Remove leading/trailing hyphens
             self.slug = slug
 
@@ -1,7 +1,7 @@
 """
 Schemas para productos (products) y precios (prices)
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
@@ -70,6 +70,31 @@ class ProductWithPrice(ProductResponse):
     brand_name: Optional[str] = None
     category_name: Optional[str] = None
 
+    @model_validator(mode='before')
+    @classmethod
+    def nest_price_columns(cls, data):
+        """
+        Anida las columnas planas pr.* de un JOIN (price_id, price, currency, ...)
+        en `price`, para validar filas SQL directamente con model_validate
+        """
+        if not isinstance(data, dict) or 'price_id' not in data:
+            return data
+        data = dict(data)
+        price_id = data.pop('price_id')
+        price = {
+            "id": price_id,
+            "product_id": data.get('id'),
+            "price": data.pop('price', None),
+            "original_price": data.pop('original_price', None),
+            "discount_percentage": data.pop('discount_percentage', None),
+            "currency": data.pop('currency', None),
+            "in_stock": data.pop('in_stock', None),
+            "created_at": data.pop('price_created_at', None),
+            "updated_at": data.pop('price_updated_at', None),
+        }
+        data['price'] = price if price_id else None
+        return data
+
 
 class ProductSearchResult(BaseModel):
     """Resultado de búsqueda de producto"""
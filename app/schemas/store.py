@@ -2,7 +2,7 @@
 Store schemas
 """
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -34,3 +34,9 @@ class StoreResponse(StoreBase):
 
     class Config:
         from_attributes = True
+
+
+class StoreBulkResult(BaseModel):
+    """Result of a bulk store insert"""
+    created: List[StoreResponse]
+    skipped: List[str] = Field(default_factory=list, description="Names that already existed")
@@ -2,21 +2,422 @@
 Servicio para gestión de productos y precios
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import text, select
-from typing import Optional, List
+from sqlalchemy import text, select, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from typing import Dict, Optional, List
 from uuid import UUID
-from datetime import datetime
 from decimal import Decimal
+from collections import OrderedDict
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _base_url(url: str) -> str:
+    """Esquema + host de una URL http(s) ("" si no lo es)"""
+    parts = urlsplit(url)
+    if parts.scheme in ("http", "https") and parts.netloc:
+        return f"{parts.scheme}://{parts.netloc}"
+    return ""
+
+
+# Filas por lote al leer get_products_by_catalog_ids (server-side cursor): solo
+# un lote de Rows vive en memoria a la vez, no el resultado completo
+CATALOG_PRODUCTS_YIELD_PER = 256
+
+# Columnas de get_products_by_catalog_ids: las del producto se copian tal cual;
+# las del precio se renombran (clave en el dict, columna en la fila)
+_PRODUCT_COLUMNS = (
+    "id", "catalog_id", "store_id", "url", "current_price", "active",
+    "created_at", "updated_at", "last_scraped_at",
+)
+_PRICE_COLUMNS = (
+    ("id", "price_id"),
+    ("product_id", "id"),
+    ("price", "price"),
+    ("original_price", "original_price"),
+    ("discount_percentage", "discount_percentage"),
+    ("currency", "currency"),
+    ("in_stock", "in_stock"),
+    ("created_at", "price_created_at"),
+    ("updated_at", "price_updated_at"),
+)
+
+
+# Sentencias SQL a nivel de módulo: se construyen una sola vez por proceso y
+# SQLAlchemy reutiliza su forma compilada en cada llamada. Los ids se enlazan
+# como uuid nativo (objetos UUID, sin str() ni parseo de texto en el servidor)
+_UUID = PG_UUID(as_uuid=True)
+_UUID_ARRAY = ARRAY(_UUID)
+
+# search_catalog_by_name, camino rápido: igualdad sobre el B-tree parcial
+# ix_products_catalog_active_lower_name
+_CATALOG_BY_EXACT_NAME_QUERY = text("""
+    SELECT 
+        pc.id,
+        pc.name,
+        pc.sku,
+        pc.brand_id,
+        b.name as brand_name,
+        pc.category_id,
+        c.name as category_name
+    FROM products_catalog pc
+    LEFT JOIN brands b ON pc.brand_id = b.id
+    LEFT JOIN categories c ON pc.category_id = c.id
+    WHERE 
+        pc.active = true
+        AND LOWER(pc.name) = :search_name
+    LIMIT 1
+""")
+
+# search_catalog_by_name, si no hubo match exacto: % usa el índice GIN
+# trigram (umbral pg_trgm.similarity_threshold = 0.3); <-> (1 - similarity)
+# ordena solo los candidatos que devolvió el índice
+_SEARCH_CATALOG_QUERY = text("""
+    SELECT 
+        pc.id,
+        pc.name,
+        pc.sku,
+        pc.brand_id,
+        b.name as brand_name,
+        pc.category_id,
+        c.name as category_name
+    FROM products_catalog pc
+    LEFT JOIN brands b ON pc.brand_id = b.id
+    LEFT JOIN categories c ON pc.category_id = c.id
+    WHERE 
+        pc.active = true
+        AND pc.name % :search_term
+    ORDER BY pc.name <-> :search_term
+    LIMIT 1
+""")
+
+# get_products_by_catalog_ids: prices guarda solo el precio vigente (único por
+# product_id, se pisa con ON CONFLICT), así que el LEFT JOIN es 1:1 y no hace
+# falta un LATERAL ... ORDER BY updated_at DESC LIMIT 1 para elegir el último
+_PRODUCTS_BY_CATALOG_QUERY = text("""
+    SELECT 
+        p.id,
+        p.catalog_id,
+        p.store_id,
+        p.url,
+        p.current_price,
+        p.active,
+        p.created_at,
+        p.updated_at,
+        p.last_scraped_at,
+        pr.id as price_id,
+        pr.price,
+        pr.original_price,
+        pr.discount_percentage,
+        pr.currency,
+        pr.in_stock,
+        pr.created_at as price_created_at,
+        pr.updated_at as price_updated_at
+    FROM products p
+    LEFT JOIN prices pr ON pr.product_id = p.id
+    WHERE p.catalog_id = ANY(:catalog_ids)
+    AND p.active = true
+""").bindparams(bindparam("catalog_ids", type_=_UUID_ARRAY))
+
+_ALL_STORES_QUERY = text("""
+    SELECT id, name, active
+    FROM stores
+""")
+
+_STORE_BY_EXACT_NAME_QUERY = text("""
+    SELECT id, name, base_url
+    FROM stores
+    WHERE active = true AND LOWER(name) = :search_name
+    LIMIT 1
+""")
+
+# get_store_by_name sin match exacto: parecido (%, similarity >= 0.3) o
+# contenido por palabras (<%, word_similarity >= 0.6: "Lider" en "Hiper Lider
+# Express", que por similarity queda en ~0.32). Ambos operadores usan el GiST
+# parcial ix_stores_active_lower_name_trgm_gist; los candidatos de % tienen
+# siempre menor distancia <-> que los que solo cumplen <%, así que ganan
+_STORE_BY_FUZZY_NAME_QUERY = text("""
+    SELECT id, name, base_url
+    FROM stores
+    WHERE active = true
+    AND (LOWER(name) % :search_name OR :search_name <% LOWER(name))
+    ORDER BY LOWER(name) <-> :search_name
+    LIMIT 1
+""")
+
+_CREATE_PRODUCT_QUERY = text("""
+    INSERT INTO products (catalog_id, store_id, category_id, url, current_price, last_scraped_at)
+    SELECT 
+        :catalog_id,
+        :store_id,
+        pc.category_id,
+        :url,
+        :price,
+        NOW()
+    FROM products_catalog pc
+    WHERE pc.id = :catalog_id
+    ON CONFLICT (catalog_id, store_id)
+    DO UPDATE SET
+        url = EXCLUDED.url,
+        current_price = EXCLUDED.current_price,
+        last_scraped_at = EXCLUDED.last_scraped_at,
+        category_id = COALESCE(EXCLUDED.category_id, products.category_id),
+        updated_at = NOW()
+    RETURNING id, catalog_id, store_id, category_id, url, current_price, active, created_at, updated_at, last_scraped_at
+""").bindparams(bindparam("catalog_id", type_=_UUID), bindparam("store_id", type_=_UUID))
+
+# create_or_update_price: si el precio no cambió, el WHERE del DO UPDATE evita
+# la escritura (sin WAL ni updated_at nuevo) y RETURNING no devuelve la fila,
+# así que se lee la existente. updated (xmax <> 0): se reescribió una existente
+_UPSERT_PRICE_QUERY = text("""
+    WITH upserted AS (
+        INSERT INTO prices (product_id, price, original_price, discount_percentage, in_stock)
+        VALUES (:product_id, :price, :original_price, :discount_percentage, :in_stock)
+        ON CONFLICT (product_id)
+        DO UPDATE SET
+            price = EXCLUDED.price,
+            original_price = EXCLUDED.original_price,
+            discount_percentage = EXCLUDED.discount_percentage,
+            in_stock = EXCLUDED.in_stock,
+            updated_at = NOW()
+        WHERE prices.price IS DISTINCT FROM EXCLUDED.price
+            OR prices.original_price IS DISTINCT FROM EXCLUDED.original_price
+            OR prices.discount_percentage IS DISTINCT FROM EXCLUDED.discount_percentage
+            OR prices.in_stock IS DISTINCT FROM EXCLUDED.in_stock
+        RETURNING id, product_id, price, original_price, discount_percentage, currency, in_stock, created_at, updated_at,
+            (xmax <> 0) AS updated
+    )
+    SELECT * FROM upserted
+    UNION ALL
+    SELECT id, product_id, price, original_price, discount_percentage, currency, in_stock, created_at, updated_at,
+        false AS updated
+    FROM prices
+    WHERE product_id = :product_id
+    AND NOT EXISTS (SELECT 1 FROM upserted)
+""").bindparams(bindparam("product_id", type_=_UUID))
+
+_UPSERT_SCRAPED_PRODUCTS_QUERY = text("""
+    WITH items AS (
+        SELECT *
+        FROM unnest(
+            :store_ids,
+            CAST(:urls AS text[]),
+            CAST(:prices AS numeric[])
+        ) AS i(store_id, url, price)
+    ),
+    upserted AS (
+        INSERT INTO products (catalog_id, store_id, category_id, url, current_price, last_scraped_at)
+        SELECT 
+            pc.id,
+            items.store_id,
+            pc.category_id,
+            items.url,
+            items.price,
+            NOW()
+        FROM items
+        JOIN products_catalog pc ON pc.id = :catalog_id
+        ON CONFLICT (catalog_id, store_id)
+        DO UPDATE SET
+            url = EXCLUDED.url,
+            current_price = EXCLUDED.current_price,
+            last_scraped_at = EXCLUDED.last_scraped_at,
+            category_id = COALESCE(EXCLUDED.category_id, products.category_id),
+            updated_at = NOW()
+        RETURNING id, catalog_id, store_id, category_id, url, current_price, active, created_at, updated_at, last_scraped_at
+    ),
+    priced AS (
+        INSERT INTO prices (product_id, price, in_stock)
+        SELECT id, current_price, true
+        FROM upserted
+        ON CONFLICT (product_id)
+        DO UPDATE SET
+            price = EXCLUDED.price,
+            original_price = EXCLUDED.original_price,
+            discount_percentage = EXCLUDED.discount_percentage,
+            in_stock = EXCLUDED.in_stock,
+            updated_at = NOW()
+        WHERE prices.price IS DISTINCT FROM EXCLUDED.price
+            OR prices.original_price IS DISTINCT FROM EXCLUDED.original_price
+            OR prices.discount_percentage IS DISTINCT FROM EXCLUDED.discount_percentage
+            OR prices.in_stock IS DISTINCT FROM EXCLUDED.in_stock
+        RETURNING id, product_id, price, original_price, discount_percentage, currency, in_stock, created_at, updated_at
+    ),
+    -- Precios sin cambios no pasan por priced: se toman tal como estaban
+    current_prices AS (
+        SELECT * FROM priced
+        UNION ALL
+        SELECT pr.id, pr.product_id, pr.price, pr.original_price, pr.discount_percentage, pr.currency, pr.in_stock, pr.created_at, pr.updated_at
+        FROM prices pr
+        JOIN upserted u ON pr.product_id = u.id
+        WHERE NOT EXISTS (SELECT 1 FROM priced WHERE priced.product_id = pr.product_id)
+    )
+    SELECT 
+        u.*,
+        pr.id as price_id,
+        pr.price,
+        pr.original_price,
+        pr.discount_percentage,
+        pr.currency,
+        pr.in_stock,
+        pr.created_at as price_created_at,
+        pr.updated_at as price_updated_at
+    FROM upserted u
+    JOIN current_prices pr ON pr.product_id = u.id
+""").bindparams(bindparam("store_ids", type_=_UUID_ARRAY), bindparam("catalog_id", type_=_UUID))
+
+# create_store: un solo statement, ON CONFLICT evita duplicados y devuelve la
+# existente (xmax = 0 solo en filas recién insertadas)
+_CREATE_STORE_QUERY = text("""
+    INSERT INTO stores (name, base_url, active)
+    VALUES (:name, :base_url, false)
+    ON CONFLICT (name) DO UPDATE 
+    SET updated_at = NOW()
+    RETURNING id, name, base_url, active, created_at, (xmax = 0) AS inserted
+""")
+
+_STORES_BY_NAMES_QUERY = text("""
+    SELECT q.search_name, s.id, s.name, s.base_url
+    FROM unnest(CAST(:names AS text[])) AS q(search_name)
+    CROSS JOIN LATERAL (
+        SELECT id, name, base_url
+        FROM stores
+        WHERE active = true
+        AND (
+            LOWER(name) % LOWER(TRIM(q.search_name))
+            OR LOWER(TRIM(q.search_name)) <% LOWER(name)
+        )
+        ORDER BY LOWER(name) <-> LOWER(TRIM(q.search_name))
+        LIMIT 1
+    ) s
+""")
+
+_CREATE_STORES_QUERY = text("""
+    INSERT INTO stores (name, base_url, active)
+    SELECT name, base_url, false
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(name text, base_url text)
+    ON CONFLICT (name) DO UPDATE 
+    SET updated_at = NOW()
+    RETURNING id, name, base_url, active, created_at
+""")
+
+_CREATE_CATALOG_PRODUCT_QUERY = text("""
+    INSERT INTO products_catalog (name, brand_id, category_id, active)
+    VALUES (:name, :brand_id, :category_id, true)
+    ON CONFLICT DO NOTHING
+    RETURNING id, name, brand_id, category_id
+""").bindparams(bindparam("brand_id", type_=_UUID), bindparam("category_id", type_=_UUID))
+
+_CATALOG_BY_NAME_QUERY = text("SELECT id, name, brand_id, category_id FROM products_catalog WHERE name = :name")
+
+_SET_CATALOG_CATEGORY_QUERY = text(
+    "UPDATE products_catalog SET category_id = :category_id WHERE id = :catalog_id"
+).bindparams(bindparam("category_id", type_=_UUID), bindparam("catalog_id", type_=_UUID))
+
+
+class _LookupCache:
+    """
+    Cache LRU en proceso con TTL: clave normalizada -> (expira, dict).
+    Se guardan dicts planos (nunca objetos ligados a la sesión) y se entregan
+    copias, porque los llamadores pueden modificarlos. El TTL acota lo viejo
+    que puede estar un worker que no vio la invalidación de otro.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return dict(value)
+
+    def put(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class _StoreDirectory:
+    """
+    Todas las tiendas en proceso: id -> (name, active). Son pocas y cambian
+    poco, así que get_products_by_catalog_ids las resuelve aquí en vez de
+    hacer JOIN con stores en cada consulta. Se recarga completa al vencer el
+    TTL o si aparece un store_id desconocido (tienda creada en otro worker).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._stores: Dict[UUID, tuple] = {}
+        self._expires = 0.0
+
+    def resolve(self, db: Session, store_ids) -> Dict[UUID, tuple]:
+        if time.monotonic() >= self._expires or not self._stores.keys() >= store_ids:
+            self._stores = {row.id: (row.name, row.active) for row in db.execute(_ALL_STORES_QUERY)}
+            self._expires = time.monotonic() + self.ttl
+        return self._stores
+
+    def clear(self) -> None:
+        self._stores = {}
+        self._expires = 0.0
+
+
+# get_products_by_catalog_ids: store_id -> nombre y estado de la tienda
+STORE_DIRECTORY_TTL = 300
+_store_directory = _StoreDirectory(STORE_DIRECTORY_TTL)
+
+# search_catalog_by_name: query normalizada -> producto del catálogo
+CATALOG_LOOKUP_CACHE_SIZE = 10_000
+CATALOG_LOOKUP_CACHE_TTL = 300
+_catalog_lookup_cache = _LookupCache(CATALOG_LOOKUP_CACHE_SIZE, CATALOG_LOOKUP_CACHE_TTL)
+
+# get_store_by_name: nombre normalizado -> tienda activa. Pocas tiendas y
+# cambian poco; solo se cachean aciertos (una tienda nueva se crea inactiva
+# y no debe quedar oculta como "no encontrada")
+STORE_LOOKUP_CACHE_SIZE = 512
+STORE_LOOKUP_CACHE_TTL = 300
+_store_lookup_cache = _LookupCache(STORE_LOOKUP_CACHE_SIZE, STORE_LOOKUP_CACHE_TTL)
 
 
 class ProductService:
     """Servicio para operaciones con productos"""
     
+    @staticmethod
+    def invalidate_catalog_cache() -> None:
+        """Vacía el cache de búsqueda por nombre (llamar al escribir en products_catalog)"""
+        _catalog_lookup_cache.clear()
+    
+    @staticmethod
+    def invalidate_store_cache() -> None:
+        """Vacía los caches de tiendas en proceso (llamar al escribir en stores)"""
+        _store_lookup_cache.clear()
+        _store_directory.clear()
+    
     @staticmethod
     def search_catalog_by_name(db: Session, product_name: str) -> Optional[dict]:
         """
         Busca un producto en el catálogo por nombre (fuzzy match)
         
+        1. Nombre exacto (sin mayúsculas): B-tree parcial sobre lower(name)
+        2. Si no hay, el más parecido por trigramas (name % :q, orden <->)
+        
+        Los aciertos se cachean en proceso por query normalizada; los misses no,
+        porque el llamador suele crear el producto a continuación.
+        
         Args:
             db: Sesión de base de datos
             product_name: Nombre del producto a buscar
@@ -24,29 +425,18 @@ class ProductService:
         Returns:
             dict con información del producto del catálogo o None
         """
-        query = text("""
-            SELECT 
-                pc.id,
-                pc.name,
-                pc.sku,
-                pc.brand_id,
-                b.name as brand_name,
-                pc.category_id,
-                c.name as category_name
-            FROM products_catalog pc
-            LEFT JOIN brands b ON pc.brand_id = b.id
-            LEFT JOIN categories c ON pc.category_id = c.id
-            WHERE 
-                pc.active = true
-                AND similarity(pc.name, :search_term) > 0.3
-            ORDER BY similarity(pc.name, :search_term) DESC
-            LIMIT 1
-        """)
-        
-        result = db.execute(query, {"search_term": product_name}).fetchone()
+        key = product_name.lower().strip()
+        cached = _catalog_lookup_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = db.execute(_CATALOG_BY_EXACT_NAME_QUERY, {"search_name": key}).fetchone()
+        
+        if not result:
+            result = db.execute(_SEARCH_CATALOG_QUERY, {"search_term": product_name}).fetchone()
         
         if result:
-            return {
+            catalog_product = {
                 "id": result.id,
                 "name": result.name,
                 "sku": result.sku,
@@ -55,6 +445,8 @@ class ProductService:
                 "category_id": result.category_id,
                 "category_name": result.category_name
             }
+            _catalog_lookup_cache.put(key, catalog_product)
+            return catalog_product
         return None
     
     @staticmethod
@@ -69,120 +461,87 @@ class ProductService:
         Returns:
             Lista de productos con precios por tienda
         """
-        query = text("""
-            SELECT 
-                p.id,
-                p.catalog_id,
-                p.store_id,
-                s.name as store_name,
-                s.active as store_active,
-                p.url,
-                p.current_price,
-                p.active,
-                p.created_at,
-                p.updated_at,
-                p.last_scraped_at,
-                pr.id as price_id,
-                pr.price,
-                pr.original_price,
-                pr.discount_percentage,
-                pr.currency,
-                pr.in_stock,
-                pr.created_at as price_created_at,
-                pr.updated_at as price_updated_at
-            FROM products p
-            LEFT JOIN stores s ON p.store_id = s.id
-            LEFT JOIN prices pr ON pr.product_id = p.id
-            WHERE p.catalog_id = :catalog_id
-            AND p.active = true
-            ORDER BY 
-                s.active DESC,
-                pr.price ASC NULLS LAST
-        """)
-        
-        results = db.execute(query, {"catalog_id": str(catalog_id)}).fetchall()
-        
-        products = []
-        for row in results:
-            product = {
-                "id": row.id,
-                "catalog_id": row.catalog_id,
-                "store_id": row.store_id,
-                "store_name": row.store_name,
-                "store_active": row.store_active,
-                "url": row.url,
-                "current_price": row.current_price,
-                "active": row.active,
-                "created_at": row.created_at,
-                "updated_at": row.updated_at,
-                "last_scraped_at": row.last_scraped_at,
-                "price": None
-            }
-            
-            if row.price_id:
-                product["price"] = {
-                    "id": row.price_id,
-                    "product_id": row.id,
-                    "price": row.price,
-                    "original_price": row.original_price,
-                    "discount_percentage": row.discount_percentage,
-                    "currency": row.currency,
-                    "in_stock": row.in_stock,
-                    "created_at": row.price_created_at,
-                    "updated_at": row.price_updated_at
-                }
+        return ProductService.get_products_by_catalog_ids(db, [catalog_id])[catalog_id]
+    
+    @staticmethod
+    def get_products_by_catalog_ids(db: Session, catalog_ids: List[UUID]) -> Dict[UUID, List[dict]]:
+        """
+        Obtiene los productos scrapeados de varios catalog_id en una sola
+        consulta (en vez de una por producto del catálogo)
+        
+        Args:
+            db: Sesión de base de datos
+            catalog_ids: IDs de productos del catálogo
             
-            products.append(product)
+        Returns:
+            dict catalog_id -> lista de productos con precios por tienda
+            (lista vacía si no tiene), cada una con el orden de
+            get_products_by_catalog_id
+        """
+        results = db.execute(
+            _PRODUCTS_BY_CATALOG_QUERY,
+            {"catalog_ids": list(catalog_ids)},
+            execution_options={"yield_per": CATALOG_PRODUCTS_YIELD_PER}
+        ).mappings()
         
-        return products
+        products_by_catalog = {catalog_id: [] for catalog_id in catalog_ids}
+        for row in results:
+            product = {key: row[key] for key in _PRODUCT_COLUMNS}
+            product["price"] = (
+                {key: row[column] for key, column in _PRICE_COLUMNS}
+                if row["price_id"] is not None else None
+            )
+            products_by_catalog[row["catalog_id"]].append(product)
+        
+        # Nombre y estado de la tienda desde el directorio en proceso (sin JOIN);
+        # el orden lo da Python: tiendas activas primero, luego menor precio
+        store_ids = {
+            product["store_id"]
+            for products in products_by_catalog.values()
+            for product in products
+        }
+        stores = _store_directory.resolve(db, store_ids) if store_ids else {}
+        for products in products_by_catalog.values():
+            for product in products:
+                product["store_name"], product["store_active"] = stores.get(product["store_id"], (None, None))
+            products.sort(key=lambda product: (
+                not product["store_active"],
+                product["price"] is None,
+                product["price"]["price"] if product["price"] is not None else 0
+            ))
+        
+        return products_by_catalog
     
     @staticmethod
     def get_store_by_name(db: Session, store_name: str) -> Optional[dict]:
         """
-        Busca una tienda por nombre con fuzzy match mejorado
+        Busca una tienda activa por nombre
         
-        Busca por:
-        1. Nombre exacto
-        2. Nombre contenido (ej: "Acuenta" en "Super Bodega Acuenta")
-        3. Similarity > 0.3 (más tolerante)
+        1. Nombre exacto (sin mayúsculas): B-tree sobre lower(name)
+        2. Si no hay, la más parecida por trigramas (similarity >= 0.3) o,
+           en su defecto, una que contenga el nombre buscado (word_similarity,
+           ej: "Acuenta" en "Super Bodega Acuenta"); ambas desde el índice
+           GiST parcial sobre lower(name)
         """
         # Limpiar el nombre de búsqueda
         clean_search = store_name.strip().lower()
+        cached = _store_lookup_cache.get(clean_search)
+        if cached is not None:
+            return cached
         
-        query = text("""
-            SELECT id, name, base_url
-            FROM stores
-            WHERE 
-                active = true
-                AND (
-                    LOWER(name) = :exact_match
-                    OR LOWER(name) LIKE :partial_match
-                    OR LOWER(:search_name) LIKE '%' || LOWER(name) || '%'
-                    OR similarity(name, :search_name) > 0.3
-                )
-            ORDER BY 
-                CASE 
-                    WHEN LOWER(name) = :exact_match THEN 1
-                    WHEN LOWER(name) LIKE :partial_match THEN 2
-                    WHEN LOWER(:search_name) LIKE '%' || LOWER(name) || '%' THEN 3
-                    ELSE 4
-                END,
-                similarity(name, :search_name) DESC
-            LIMIT 1
-        """)
-        
-        result = db.execute(query, {
-            "exact_match": clean_search,
-            "partial_match": f"%{clean_search}%",
-            "search_name": store_name
-        }).fetchone()
+        result = db.execute(_STORE_BY_EXACT_NAME_QUERY, {"search_name": clean_search}).fetchone()
+        
+        if not result:
+            result = db.execute(_STORE_BY_FUZZY_NAME_QUERY, {"search_name": clean_search}).fetchone()
         
         if result:
-            return {
+            store = {
                 "id": result.id,
                 "name": result.name,
                 "base_url": result.base_url
             }
+            _store_lookup_cache.put(clean_search, store)
+            return store
         return None
     
     @staticmethod
@@ -191,7 +550,8 @@ class ProductService:
         catalog_id: UUID,
         store_id: UUID,
         url: str,
-        price: Optional[Decimal] = None
+        price: Optional[Decimal] = None,
+        commit: bool = True
     ) -> dict:
         """
         Crea un producto en la tabla products copiando category_id desde catalog
@@ -202,52 +562,22 @@ class ProductService:
             store_id: ID de la tienda
             url: URL del producto en la tienda
             price: Precio actual (opcional)
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
             
         Returns:
             dict con el producto creado
         """
-        query = text("""
-            INSERT INTO products (catalog_id, store_id, category_id, url, current_price, last_scraped_at)
-            SELECT 
-                :catalog_id,
-                :store_id,
-                pc.category_id,
-                :url,
-                :price,
-                :scraped_at
-            FROM products_catalog pc
-            WHERE pc.id = :catalog_id
-            ON CONFLICT (catalog_id, store_id)
-            DO UPDATE SET
-                url = EXCLUDED.url,
-                current_price = EXCLUDED.current_price,
-                last_scraped_at = EXCLUDED.last_scraped_at,
-                category_id = COALESCE(EXCLUDED.category_id, products.category_id),
-                updated_at = NOW()
-            RETURNING id, catalog_id, store_id, category_id, url, current_price, created_at, updated_at, last_scraped_at
-        """)
-        
-        result = db.execute(query, {
-            "catalog_id": str(catalog_id),
-            "store_id": str(store_id),
+        row = db.execute(_CREATE_PRODUCT_QUERY, {
+            "catalog_id": catalog_id,
+            "store_id": store_id,
             "url": url,
-            "price": float(price) if price else None,
-            "scraped_at": datetime.now()
-        }).fetchone()
+            "price": price
+        }).mappings().one()
         
-        db.commit()
+        if commit:
+            db.commit()
         
-        return {
-            "id": result.id,
-            "catalog_id": result.catalog_id,
-            "store_id": result.store_id,
-            "category_id": result.category_id,
-            "url": result.url,
-            "current_price": result.current_price,
-            "created_at": result.created_at,
-            "updated_at": result.updated_at,
-            "last_scraped_at": result.last_scraped_at
-        }
+        return dict(row)
     
     @staticmethod
     def create_or_update_price(
@@ -256,7 +586,8 @@ class ProductService:
         price: Decimal,
         original_price: Optional[Decimal] = None,
         discount_percentage: Optional[Decimal] = None,
-        in_stock: bool = True
+        in_stock: bool = True,
+        commit: bool = True
     ) -> dict:
         """
         Crea o actualiza el precio de un producto
@@ -268,90 +599,112 @@ class ProductService:
             original_price: Precio original (opcional)
             discount_percentage: Porcentaje de descuento (opcional)
             in_stock: Si está en stock
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
             
         Returns:
-            dict con el precio creado/actualizado
+            dict con el precio creado/actualizado; "updated" es True solo si
+            se reescribió un precio existente (False si es nuevo o no cambió)
         """
-        query = text("""
-            INSERT INTO prices (product_id, price, original_price, discount_percentage, in_stock)
-            VALUES (:product_id, :price, :original_price, :discount_percentage, :in_stock)
-            ON CONFLICT (product_id)
-            DO UPDATE SET
-                price = EXCLUDED.price,
-                original_price = EXCLUDED.original_price,
-                discount_percentage = EXCLUDED.discount_percentage,
-                in_stock = EXCLUDED.in_stock,
-                updated_at = NOW()
-            RETURNING id, product_id, price, original_price, discount_percentage, currency, in_stock, created_at, updated_at
-        """)
-        
-        result = db.execute(query, {
-            "product_id": str(product_id),
-            "price": float(price),
-            "original_price": float(original_price) if original_price else None,
-            "discount_percentage": float(discount_percentage) if discount_percentage else None,
+        row = db.execute(_UPSERT_PRICE_QUERY, {
+            "product_id": product_id,
+            "price": price,
+            "original_price": original_price,
+            "discount_percentage": discount_percentage,
             "in_stock": in_stock
-        }).fetchone()
+        }).mappings().one()
         
-        db.commit()
+        if commit:
+            db.commit()
         
-        return {
-            "id": result.id,
-            "product_id": result.product_id,
-            "price": result.price,
-            "original_price": result.original_price,
-            "discount_percentage": result.discount_percentage,
-            "currency": result.currency,
-            "in_stock": result.in_stock,
-            "created_at": result.created_at,
-            "updated_at": result.updated_at
-        }
+        return dict(row)
+    
+    @staticmethod
+    def upsert_scraped_products(db: Session, catalog_id: UUID, items: List[dict], commit: bool = True) -> List[dict]:
+        """
+        Crea o actualiza en bloque los productos de un catálogo y sus precios
+        
+        Una sola sentencia: INSERT ... ON CONFLICT sobre products y, encadenado
+        por CTE, sobre prices. Reemplaza create_product + create_or_update_price
+        por tienda (2 round-trips y 2 commits cada una). Las filas viajan como
+        arrays tipados (unnest), sin serializar a JSON.
+        
+        Args:
+            db: Sesión de base de datos
+            catalog_id: ID del producto en catálogo
+            items: dicts con store_id, url y price; a lo más uno por tienda
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
+            
+        Returns:
+            Lista de productos con su precio anidado en "price"
+        """
+        if not items:
+            return []
+        
+        results = db.execute(_UPSERT_SCRAPED_PRODUCTS_QUERY, {
+            "store_ids": [item["store_id"] for item in items],
+            "urls": [item["url"] for item in items],
+            "prices": [item["price"] for item in items],
+            "catalog_id": catalog_id
+        }).fetchall()
+        
+        if commit:
+            db.commit()
+        
+        return [
+            {
+                "id": row.id,
+                "catalog_id": row.catalog_id,
+                "store_id": row.store_id,
+                "category_id": row.category_id,
+                "url": row.url,
+                "current_price": row.current_price,
+                "active": row.active,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+                "last_scraped_at": row.last_scraped_at,
+                "price": {
+                    "id": row.price_id,
+                    "product_id": row.id,
+                    "price": row.price,
+                    "original_price": row.original_price,
+                    "discount_percentage": row.discount_percentage,
+                    "currency": row.currency,
+                    "in_stock": row.in_stock,
+                    "created_at": row.price_created_at,
+                    "updated_at": row.price_updated_at
+                }
+            }
+            for row in results
+        ]
     
     @staticmethod
-    def create_store(db: Session, name: str, base_url: str = "") -> dict:
+    def create_store(db: Session, name: str, base_url: str = "", commit: bool = True) -> dict:
         """
         Crea una nueva tienda automáticamente como "pendiente de validación"
-        Si ya existe con ese nombre, retorna la existente
+        Si ya existe con ese nombre exacto, retorna la existente (ON CONFLICT);
+        el flag "inserted" indica cuál de los dos casos fue
         
         Args:
             db: Sesión de base de datos
             name: Nombre de la tienda
             base_url: URL base (opcional)
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
             
         Returns:
             dict con la tienda creada o existente
         """
-        # Primero intentar buscarla por nombre exacto
-        existing = ProductService.get_store_by_name(db, name)
-        if existing:
-            return existing
-        
-        # Si no existe, crear con ON CONFLICT para evitar duplicados
-        query = text("""
-            INSERT INTO stores (name, base_url, active)
-            VALUES (:name, :base_url, false)
-            ON CONFLICT (name) DO UPDATE 
-            SET updated_at = NOW()
-            RETURNING id, name, base_url, active, created_at
-        """)
-        
-        result = db.execute(query, {
+        row = db.execute(_CREATE_STORE_QUERY, {
             "name": name,
             "base_url": base_url or f"https://{name.lower().replace(' ', '')}.cl"
-        }).fetchone()
+        }).mappings().one()
         
-        db.commit()
+        if commit:
+            db.commit()
         
-        return {
-            "id": result.id,
-            "name": result.name,
-            "base_url": result.base_url,
-            "active": result.active,
-            "created_at": result.created_at
-        }
+        return dict(row)
     
     @staticmethod
-    def get_store_by_name_or_create(db: Session, store_name: str, store_url: str = "") -> dict:
+    def get_store_by_name_or_create(db: Session, store_name: str, store_url: str = "", commit: bool = True) -> dict:
         """
         Busca una tienda por nombre o la crea si no existe
         
@@ -359,6 +712,7 @@ class ProductService:
             db: Sesión de base de datos
             store_name: Nombre de la tienda
             store_url: URL de la tienda (para extraer base_url)
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
             
         Returns:
             dict con la tienda encontrada o creada
@@ -370,21 +724,78 @@ class ProductService:
             return store
         
         # Si no existe, crearla como inactiva (pendiente de validación)
-        print(f"⚠️  Tienda no encontrada: '{store_name}' - Creando automáticamente...")
+        logger.info("Tienda no encontrada: '%s' - creando automáticamente", store_name)
         
         # Extraer base_url del URL del producto si está disponible
-        base_url = ""
-        if store_url:
-            import re
-            match = re.match(r'(https?://[^/]+)', store_url)
-            if match:
-                base_url = match.group(1)
+        base_url = _base_url(store_url) if store_url else ""
         
-        new_store = ProductService.create_store(db, store_name, base_url)
-        print(f"✅ Tienda creada (inactiva): {new_store['name']} - ID: {new_store['id']}")
+        new_store = ProductService.create_store(db, store_name, base_url, commit=commit)
+        if new_store['inserted']:
+            logger.info("Tienda creada (inactiva): %s - ID: %s", new_store['name'], new_store['id'])
+        else:
+            logger.info("Tienda ya existía: %s - ID: %s", new_store['name'], new_store['id'])
 
         return new_store
 
+    @staticmethod
+    def get_stores_by_names_or_create(db: Session, store_urls: Dict[str, str], commit: bool = True) -> Dict[str, dict]:
+        """
+        Versión en bloque de get_store_by_name_or_create para los vendedores
+        de un scraping: un SELECT (mismo match que get_store_by_name, por
+        LATERAL; el exacto tiene distancia 0 y sale primero) y un INSERT
+        multi-fila para las que falten.
+        
+        Args:
+            db: Sesión de base de datos
+            store_urls: nombre de la tienda -> URL del producto (para base_url)
+            commit: Si es False no hace commit (el llamador agrupa la transacción)
+            
+        Returns:
+            dict nombre buscado -> tienda encontrada o creada
+        """
+        if not store_urls:
+            return {}
+        
+        stores = {}
+        names = []
+        for name in store_urls:
+            cached = _store_lookup_cache.get(name.strip().lower())
+            if cached is not None:
+                stores[name] = cached
+            else:
+                names.append(name)
+        
+        if names:
+            for row in db.execute(_STORES_BY_NAMES_QUERY, {"names": names}):
+                store = {"id": row.id, "name": row.name, "base_url": row.base_url}
+                _store_lookup_cache.put(row.search_name.strip().lower(), store)
+                stores[row.search_name] = store
+        
+        missing = [name for name in names if name not in stores]
+        if missing:
+            # Las que no existen se crean inactivas (pendientes de validación)
+            logger.info("Tiendas no encontradas, creando automáticamente: %s", missing)
+            rows = []
+            for name in missing:
+                rows.append({
+                    "name": name,
+                    "base_url": _base_url(store_urls[name] or "") or f"https://{name.lower().replace(' ', '')}.cl"
+                })
+            
+            for row in db.execute(_CREATE_STORES_QUERY, {"rows": json.dumps(rows)}):
+                stores[row.name] = {
+                    "id": row.id,
+                    "name": row.name,
+                    "base_url": row.base_url,
+                    "active": row.active,
+                    "created_at": row.created_at
+                }
+        
+        if commit:
+            db.commit()
+        
+        return stores
+
     @staticmethod
     def create_catalog_product(
         db: Session,
@@ -396,23 +807,18 @@ class ProductService:
         Crea un producto en products_catalog cuando no se encuentra por búsqueda.
         brand_id y category_id son opcionales — se pueden completar desde el admin después.
         """
-        query = text("""
-            INSERT INTO products_catalog (name, brand_id, category_id, active)
-            VALUES (:name, :brand_id, :category_id, true)
-            ON CONFLICT DO NOTHING
-            RETURNING id, name, brand_id, category_id
-        """)
-        result = db.execute(query, {
+        result = db.execute(_CREATE_CATALOG_PRODUCT_QUERY, {
             "name": name,
-            "brand_id": str(brand_id) if brand_id else None,
-            "category_id": str(category_id) if category_id else None,
+            "brand_id": brand_id,
+            "category_id": category_id,
         }).fetchone()
         db.commit()
+        ProductService.invalidate_catalog_cache()
 
         if not result:
             # Si hubo conflicto, buscar el existente
             existing = db.execute(
-                text("SELECT id, name, brand_id, category_id FROM products_catalog WHERE name = :name"),
+                _CATALOG_BY_NAME_QUERY,
                 {"name": name}
             ).fetchone()
             return {"id": existing.id, "name": existing.name,
@@ -422,3 +828,26 @@ class ProductService:
         return {"id": result.id, "name": result.name,
                 "brand_id": result.brand_id, "category_id": result.category_id,
                 "brand_name": None, "category_name": None, "sku": None}
+
+    @staticmethod
+    def set_catalog_category(db: Session, catalog_id: UUID, category_id: UUID, commit: bool = True) -> None:
+        """
+        Asigna la categoría de un producto del catálogo
+
+        Args:
+            db: Sesión de base de datos
+            catalog_id: ID del producto en catálogo
+            category_id: ID de la categoría
+            commit: Si es False no hace commit (el llamador agrupa la transacción
+                y debe llamar a invalidate_catalog_cache después de su commit)
+        """
+        db.execute(_SET_CATALOG_CATEGORY_QUERY, {
+            "catalog_id": catalog_id,
+            "category_id": category_id
+        })
+
+        # Invalidar solo con el cambio ya confirmado: antes, un lector
+        # concurrente podría volver a cachear la fila vieja por todo el TTL
+        if commit:
+            db.commit()
+            ProductService.invalidate_catalog_cache()
@@ -0,0 +1,84 @@
+-- Índices que las consultas de la API necesitan en una BD existente.
+--
+-- Alembic no está inicializado y no hay create_all: los índices declarados en
+-- __table_args__ de app/models no se crean solos, y products/prices ni siquiera
+-- tienen modelo. Se aplican a mano (idempotente, se puede re-ejecutar):
+--   psql "$DATABASE_URL" -f sql/indexes.sql
+-- CONCURRENTLY no bloquea escrituras; no se puede ejecutar dentro de una
+-- transacción (psql sin --single-transaction).
+
+-- products_catalog.name único (uq_products_catalog_name en el modelo):
+-- _create_catalog_products hace INSERT ... ON CONFLICT (name) DO NOTHING, que
+-- Postgres rechaza si no existe un índice único sobre name.
+-- Antes se deduplica: se conserva el más antiguo de cada nombre y los demás se
+-- renombran con su id y se desactivan (no se borran: products los referencia).
+UPDATE products_catalog pc
+SET name = LEFT(pc.name, 500 - 39) || ' [' || pc.id || ']',
+    active = false
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY name ORDER BY created_at, id) AS n
+    FROM products_catalog
+) dup
+WHERE pc.id = dup.id AND dup.n > 1;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_products_catalog_name
+    ON products_catalog (name);
+
+-- Índices declarados en __table_args__ / index=True de app/models (mismos
+-- nombres que genera SQLAlchemy). Los únicos de stores/brands/manufacturers.name
+-- ya existían en el esquema original (create_store depende de ON CONFLICT (name)).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Keyset pagination de los listados: ORDER BY created_at DESC, id DESC
+-- con filtro (created_at, id) < (:created_at, :id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_categories_created_id
+    ON categories (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_manufacturers_created_id
+    ON manufacturers (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_created_id
+    ON products_catalog (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stores_created_id
+    ON stores (created_at DESC, id DESC);
+
+-- Claves foráneas consultadas en los guards de DELETE (EXISTS) y en los filtros
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_brands_manufacturer_id
+    ON brands (manufacturer_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_categories_parent_id
+    ON categories (parent_id);
+
+-- Búsqueda por substring (name ILIKE '%x%') y fuzzy (name % :q, <->) con pg_trgm
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_manufacturers_name_trgm
+    ON manufacturers USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_name_trgm
+    ON products_catalog USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_sku_trgm
+    ON products_catalog USING gin (sku gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stores_name_trgm
+    ON stores USING gin (name gin_trgm_ops);
+
+-- detect_category_from_name: prefijo dentro de una marca, lower(name) LIKE 'x%'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_brand_lower_name
+    ON products_catalog (brand_id, lower(name) text_pattern_ops);
+
+-- search_catalog_by_name: match exacto sin mayúsculas antes del fuzzy
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_active_lower_name
+    ON products_catalog (lower(name)) WHERE active = true;
+
+-- get_store_by_name: match exacto por lower(name) y, si no hay, el más cercano
+-- entre tiendas activas (%, <% y KNN <-> sobre el GiST)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stores_lower_name
+    ON stores (lower(name));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stores_active_lower_name_trgm_gist
+    ON stores USING gist (lower(name) gist_trgm_ops) WHERE active = true;
+
+-- ProductService.get_products_by_catalog_ids: WHERE catalog_id = ANY(...) AND active.
+-- INCLUDE lleva todas las columnas de products que proyecta la consulta,
+-- active incluida: la columna del WHERE parcial no se guarda en el índice, y
+-- sin ella habría que leer cada fila de la tabla (no sería index-only scan).
+-- prices(product_id) ya tiene índice único (ON CONFLICT (product_id)).
+-- Nombre nuevo porque IF NOT EXISTS no reemplaza la versión anterior (sin
+-- active en INCLUDE), que se elimina una vez creado este.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_catalog_active_covering
+    ON products (catalog_id)
+    INCLUDE (id, store_id, url, current_price, active, created_at, updated_at, last_scraped_at)
+    WHERE active;
+DROP INDEX CONCURRENTLY IF EXISTS ix_products_catalog_active;